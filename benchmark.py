@@ -0,0 +1,315 @@
+from cogs.game import Game
+from cogs.utils.chess import Chess, get_uci
+from cogs.utils.users import UserCache
+from typing import Dict, List
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import functools
+import os
+import random
+import tempfile
+import time
+
+# time spent in each part of the command that is running in this task
+timings = contextvars.ContextVar('timings')
+PARTS = ('legality', 'rendering', 'io')
+
+
+def timed(function, part):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            add_time(part, time.perf_counter() - start)
+    return wrapper
+
+
+def timed_async(function, part):
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await function(*args, **kwargs)
+        finally:
+            add_time(part, time.perf_counter() - start)
+    return wrapper
+
+
+def add_time(part, elapsed):
+    current = timings.get(None)
+    if current is not None:
+        current[part] = current.get(part, 0) + elapsed
+
+
+class Permissions:
+    def __init__(self, manage_guild):
+        self.manage_guild = manage_guild
+
+
+class User:
+    def __init__(self, user_id, name):
+        self.id = user_id
+        self.name = name
+        self.guild_permissions = Permissions(True)
+
+    def __str__(self):
+        return self.name
+
+
+class Guild:
+    def __init__(self, guild_id, name):
+        self.id = guild_id
+        self.name = name
+
+
+class Channel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+
+class Context:
+    def __init__(self, bot, guild, author, latency):
+        self.bot = bot
+        self.guild = guild
+        self.channel = Channel(guild.id)
+        self.author = author
+        self.latency = latency
+        self.replied = asyncio.Event()
+
+    async def send(self, content=None, file=None, embed=None):
+        start = time.perf_counter()
+        if file is not None:
+            # what would be uploaded to discord
+            file.fp.read()
+        await asyncio.sleep(self.latency)
+        add_time('io', time.perf_counter() - start)
+        self.replied.set()
+
+    def typing(self):
+        return Typing()
+
+
+class Typing:
+    async def __aenter__(self):
+        pass
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        pass
+
+
+class Bot:
+    def __init__(self, config):
+        self.config = config
+        self.command_prefix = '?'
+        self.user = User(1, 'MechaNozo')
+        self.user_cache = UserCache(self.get_user_info)
+
+    async def get_user_info(self, user_id):
+        return User(user_id, f'user{user_id}')
+
+
+class Benchmark:
+    def __init__(self, cog, latency):
+        self.cog = cog
+        self.latency = latency
+        self.samples = {}  # type: Dict[str, List[Dict[str, float]]]
+        self.pending = []
+
+    def context(self, guild, author):
+        return Context(self.cog.bot, guild, author, self.latency)
+
+    async def run(self, name, ctx, *args, **kwargs):
+        current = {}
+        timings.set(current)
+        start = time.perf_counter()
+        command = getattr(Game, name)
+
+        if name == 'challenge':
+            # a challenge waits a minute for an answer, only the time until
+            # the reply counts
+            task = asyncio.ensure_future(
+                command.callback(self.cog, ctx, *args, **kwargs))
+            self.pending.append(task)
+            await ctx.replied.wait()
+        else:
+            await command.callback(self.cog, ctx, *args, **kwargs)
+
+        current['total'] = time.perf_counter() - start
+        self.samples.setdefault(name, []).append(current)
+
+    async def play(self, guild, white_user, black_user, moves, plies, seed):
+        rng = random.Random(seed)
+        users = {white_user.id: white_user, black_user.id: black_user}
+        player = white_user
+
+        await self.run('challenge', self.context(guild, white_user),
+                       black_user)
+        await self.run('accept', self.context(guild, black_user))
+        match = next(game for game in self.cog.games.values()
+                     if game.guild_id == guild.id
+                     and {game.white, game.black} == set(users))
+        game_id = match.game_id
+
+        for ply in range(plies):
+            if match.gameover:
+                return
+
+            player = users[match.white if match.white_turn else match.black]
+            if moves is not None:
+                if ply >= len(moves):
+                    break
+                move = moves[ply]
+            else:
+                x, y, nx, ny = rng.choice(match.board.get_legal_moves())
+                promote_to = None
+                if match.board.chessboard[y][x].name == 'pawn' \
+                        and ny in (0, 7):
+                    promote_to = rng.choice(
+                        ('queen', 'rook', 'bishop', 'knight'))
+                # players write moves both ways
+                if rng.random() < 0.5:
+                    move = get_uci(x, y, nx, ny, promote_to)
+                else:
+                    move = match.board.move_to_san(x, y, nx, ny, promote_to)
+
+            await self.run('move', self.context(guild, player),
+                           game_id, notation=move)
+
+            if rng.random() < 0.1:
+                await self.run('board', self.context(guild, player), game_id)
+
+            if rng.random() < 0.02 and not match.gameover:
+                # both players agree to take the move back, then it's replayed
+                for user in users.values():
+                    await self.run('takeback', self.context(guild, user),
+                                   game_id)
+                await self.run('move', self.context(guild, player),
+                               game_id, notation=move)
+
+        if not match.gameover:
+            if rng.random() < 0.5:
+                for user in users.values():
+                    await self.run('draw', self.context(guild, user), game_id)
+            else:
+                await self.run('surrender', self.context(guild, player),
+                               game_id)
+
+    async def play_guild(self, guild, games, plies, first_user, seed):
+        for number, moves in enumerate(games):
+            white_user = User(first_user + number * 2,
+                              f'user{first_user + number * 2}')
+            black_user = User(first_user + number * 2 + 1,
+                              f'user{first_user + number * 2 + 1}')
+            await self.play(guild, white_user, black_user, moves, plies,
+                            seed + number)
+
+    def report(self, elapsed):
+        total = sum(len(samples) for samples in self.samples.values())
+        print(f'{total} commands in {elapsed:.2f}s '
+              f'({total / elapsed:,.0f} commands/s)')
+        print(f'{"command":<10}{"count":>7}{"p50 ms":>9}{"p99 ms":>9}'
+              + ''.join(f'{part:>11}' for part in PARTS + ('other',)))
+
+        for name in sorted(self.samples):
+            samples = self.samples[name]
+            totals = sorted(sample['total'] for sample in samples)
+            parts = []
+            for part in PARTS:
+                parts.append(sum(sample.get(part, 0) for sample in samples)
+                             / len(samples))
+            parts.append(sum(totals) / len(samples) - sum(parts))
+            print(f'{name:<10}{len(samples):>7}'
+                  f'{percentile(totals, 0.5) * 1000:>9.2f}'
+                  f'{percentile(totals, 0.99) * 1000:>9.2f}'
+                  + ''.join(f'{part * 1000:>11.2f}' for part in parts))
+        print('legality, rendering, io and other are mean ms per command')
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def load_games(path):
+    # one game per line, moves like the move command takes them: e4 e5 Nf3
+    # or e2e4 e7e5 g1f3
+    with open(path, 'r') as file:
+        return [line.split() for line in file if line.strip()]
+
+
+async def benchmark(args):
+    if args.games_file is not None:
+        games = load_games(args.games_file)
+        games = [games[i % len(games)] for i in range(args.games)]
+    else:
+        games = [None] * args.games
+
+    config = {'render_executor': args.render_executor,
+              'render_workers': args.render_workers,
+              'render_cache_bytes': args.render_cache_bytes,
+              'engine_workers': 1}
+    cog = Game(Bot(config))
+    Chess.move = timed(Chess.move, 'legality')
+    Chess.takeback = timed(Chess.takeback, 'legality')
+    cog.render_pool.render = timed_async(cog.render_pool.render, 'rendering')
+    cog.update_ranks = timed(cog.update_ranks, 'io')
+    bench = Benchmark(cog, args.latency / 1000)
+
+    guilds = []
+    for number in range(args.guilds):
+        guild = Guild(1000 + number, f'guild{number}')
+        guild_games = games[number::args.guilds]
+        guilds.append(bench.play_guild(guild, guild_games, args.plies,
+                                       10000 + number * args.games * 2,
+                                       args.seed + number * args.games))
+
+    start = time.perf_counter()
+    await asyncio.gather(*guilds)
+    elapsed = time.perf_counter() - start
+
+    for task in bench.pending:
+        task.cancel()
+    await asyncio.gather(*bench.pending, return_exceptions=True)
+    cog._Game__unload()
+    return bench, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Play games through the chess commands with fake '
+                    'discord objects and time every command.')
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--guilds', type=int, default=20)
+    parser.add_argument('--plies', type=int, default=80,
+                        help='most moves played in each game before it ends '
+                             'with a draw or a surrender')
+    parser.add_argument('--games-file',
+                        help='games to replay, one per line with moves like '
+                             '"e4 e5 Nf3" or "e2e4 e7e5 g1f3" '
+                             '(default: random legal moves)')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='simulated milliseconds for every message sent')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--render-executor', default='thread',
+                        choices=('thread', 'process'))
+    parser.add_argument('--render-workers', type=int, default=4)
+    parser.add_argument('--render-cache-bytes', type=int,
+                        default=32 * 1024 * 1024)
+    args = parser.parse_args()
+
+    # the cog saves ranks in the working directory and prints every game
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        loop = asyncio.new_event_loop()
+        with open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stdout(devnull):
+            bench, elapsed = loop.run_until_complete(benchmark(args))
+        loop.close()
+    bench.report(elapsed)
+
+
+if __name__ == '__main__':
+    main()
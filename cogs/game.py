@@ -1,11 +1,20 @@
 from discord.ext import commands
-from .utils.chess import Chess
-from typing import Dict
+from .utils.board import Board
+from .utils.chess import Chess, get_uci
+from .utils.engine import best_move, get_search_board
+from .utils.fen import PIECE_LETTERS
+from .utils.journal import GameJournal
+from .utils.ratings import RatingStore
+from .utils.render import RenderPool
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Set
 import discord
-import json
 import math
 import asyncio
 import random
+import sys
+
+RANKS_PER_PAGE = 10
 
 
 class Game:
@@ -15,21 +24,43 @@ class Game:
         self.bot = bot
         self.last_game_id = 0
         self.games = {}  # type: Dict[int, Chess]
-        self.ranks = {}  # type: Dict[int, Dict[int, float]]
+        self.user_games = {}  # type: Dict[int, Set[int]]
+        self.guild_games = {}  # type: Dict[int, Set[int]]
+        self.ratings = RatingStore(
+            bot.config.get('ranks_directory', 'ranks'),
+            bot.config.get('ranks_delay', 5.0),
+            bot.config.get('ranks_idle', 600.0))
         self.requests = {}  # type: Dict[int, Dict[int, int]]
-
-        try:
-            with open('ranks.json', 'r') as ranks_file:
-                raw_dict = json.loads(ranks_file.read())
-                self.ranks = {
-                    int(g): {
-                        int(i): e for i, e in raw_dict[g].items()
-                    }
-                    for g, r in raw_dict.items()
-                }
-
-        except FileNotFoundError:
-            pass
+        self.setups = {}  # type: Dict[int, Dict[int, str]]
+        self.render_pool = RenderPool(
+            bot.config.get('render_executor', 'thread'),
+            bot.config.get('render_workers', 4),
+            bot.config.get('render_cache_bytes', 32 * 1024 * 1024))
+        self.engine_pool = ProcessPoolExecutor(
+            bot.config.get('engine_workers', 2))
+        self.engine_time = bot.config.get('engine_time', 2.0)
+        self.engine_nodes = bot.config.get('engine_nodes')
+        self.max_guild_games = bot.config.get('max_guild_games')
+
+        # games that were still being played when the bot stopped
+        self.journal = GameJournal(
+            bot.config.get('journal_path', 'games.db'),
+            bot.config.get('journal_delay', 1.0))
+        self.last_game_id, saved_games = self.journal.load()
+        self.engine_times = self.journal.load_engine_times()
+        restored = []
+        for game, moves in saved_games:
+            match = self.restore_game(game, moves)
+            if match is not None:
+                restored.append(match)
+        if restored:
+            asyncio.ensure_future(self.resume_games(restored))
+
+    def __unload(self):
+        self.render_pool.shutdown()
+        self.engine_pool.shutdown(wait=False)
+        self.journal.close()
+        self.ratings.close()
 
     async def verify_game(self, ctx, game_id, user_id, guild_id):
         if game_id not in self.games:
@@ -54,72 +85,250 @@ class Game:
         else:
             return True
 
-    def new_game(self, white, black, guild_id, guild_name):
+    async def new_game(self, white, black, guild_id, guild_name, channel_id,
+                       fen=None):
+        users = await self.bot.user_cache.get_many((white, black))
         self.last_game_id += 1
 
-        if guild_id not in self.ranks:
-            self.ranks[guild_id] = {}
-
-        guild_ranks = self.ranks[guild_id]
+        guild_ranks = self.ratings.get(guild_id)
 
         if white not in guild_ranks:
-            guild_ranks[white] = 1000.0
+            self.ratings.set(guild_id, white, 1000.0)
         if black not in guild_ranks:
-            guild_ranks[black] = 1000.0
+            self.ratings.set(guild_id, black, 1000.0)
 
-        white_name = str(self.bot.usernames[white])
-        black_name = str(self.bot.usernames[black])
+        white_name = str(users[white])
+        black_name = str(users[black])
 
-        self.games[self.last_game_id] = \
-            Chess(white, black, self.last_game_id,
-                  guild_id, guild_name,
-                  white_name, black_name,
-                  int(guild_ranks[white]), int(guild_ranks[black]))
+        match = Chess(white, black, self.last_game_id,
+                      guild_id, guild_name,
+                      white_name, black_name,
+                      int(guild_ranks[white]), int(guild_ranks[black]),
+                      fen=fen, channel_id=channel_id)
+        self.add_game(match)
+        self.journal.add_game(match)
 
         print(f'New match starting on guild {guild_id}:')
         print(f'id {self.last_game_id}, '
-              f'{self.bot.usernames[white]}(id {white})(white) '
-              f'vs {self.bot.usernames[black]}(id {black})(black)')
+              f'{white_name}(id {white})(white) '
+              f'vs {black_name}(id {black})(black)')
         print('__________________')
+        return match
+
+    def restore_game(self, game, moves):
+        game_id, guild_id, guild_name, white, black, white_user, \
+            black_user, white_elo, black_elo, date, fen, channel_id = game
+        match = Chess(white, black, game_id, guild_id, guild_name,
+                      white_user, black_user, white_elo, black_elo, fen=fen,
+                      channel_id=channel_id)
+        match.date = date
+
+        for move, promotion in moves:
+            player_id = match.white if match.white_turn else match.black
+            if match.move(player_id,
+                          move + PIECE_LETTERS.get(promotion, '')):
+                print(f'Could not replay {move} in game {game_id}!',
+                      file=sys.stderr)
+                break
+
+        if match.gameover:
+            # the bot stopped before the end of the game was saved
+            self.journal.end_game(game_id)
+            return None
+        self.add_game(match)
+        return match
+
+    async def resume_games(self, matches):
+        # the bot only knows who it is once it's logged in, then it carries
+        # on with the games where it was thinking when it stopped, unless
+        # their channel was deleted in the meantime
+        await self.bot.wait_until_ready()
+        bot_id = self.bot.user.id
+        moves = []
+        for match in matches:
+            channel = self.bot.get_channel(match.channel_id)
+            if channel is not None \
+                    and self.games.get(match.game_id) is match \
+                    and bot_id == (match.white if match.white_turn
+                                   else match.black):
+                moves.append(self.engine_move(channel, match))
+        await asyncio.gather(*moves)
+
+    def play_move(self, match, user_id, notation):
+        error = match.move(user_id, notation)
+        if not error:
+            self.journal.add_move(match.game_id,
+                                  len(match.board.history) - 1,
+                                  get_uci(match.old_x, match.old_y,
+                                          match.new_x, match.new_y),
+                                  match.promote_to)
+        return error
+
+    def add_game(self, match):
+        # games are also found by player and by guild
+        self.games[match.game_id] = match
+        for user_id in (match.white, match.black):
+            self.user_games.setdefault(user_id, set()).add(match.game_id)
+        self.guild_games.setdefault(match.guild_id, set()).add(match.game_id)
+
+    def end_game(self, game_id):
+        match = self.games.pop(game_id)
+        for user_id in (match.white, match.black):
+            self.user_games[user_id].discard(game_id)
+            if not self.user_games[user_id]:
+                self.user_games.pop(user_id)
+        self.guild_games[match.guild_id].discard(game_id)
+        if not self.guild_games[match.guild_id]:
+            self.guild_games.pop(match.guild_id)
+        self.journal.end_game(game_id)
 
     def update_ranks(self, guild_id, stalemate, winner, loser):
-        guild_ranks = self.ranks[guild_id]
-        ows = guild_ranks[winner]
-        ols = guild_ranks[loser]
+        guild_ranks = self.ratings.get(guild_id)
+        # players of a game restored after a restart may not be saved yet
+        ows = guild_ranks.get(winner, 1000.0)
+        ols = guild_ranks.get(loser, 1000.0)
 
-        tr_winner = math.pow(10, guild_ranks[winner] / 400)
-        tr_loser = math.pow(10, guild_ranks[loser] / 400)
+        tr_winner = math.pow(10, ows / 400)
+        tr_loser = math.pow(10, ols / 400)
 
         prop_w = tr_winner / (tr_winner + tr_loser)
         prop_l = tr_loser / (tr_winner + tr_loser)
 
         if not stalemate:
-            guild_ranks[winner] = guild_ranks[winner] + 32 * (1 - prop_w)
-            guild_ranks[loser] = guild_ranks[loser] - 32 * prop_l
+            nws = ows + 32 * (1 - prop_w)
+            nls = ols - 32 * prop_l
         else:
-            guild_ranks[winner] = guild_ranks[winner] + 32 * (0.5 - prop_w)
-            guild_ranks[loser] = guild_ranks[loser] + 32 * (0.5 - prop_l)
-
-        print(f'{self.bot.usernames[winner]} '
-              f'score change: {ows} -> {guild_ranks[winner]}')
-        print(f'{self.bot.usernames[loser]} '
-              f'score change: {ols} -> {guild_ranks[loser]}')
+            nws = ows + 32 * (0.5 - prop_w)
+            nls = ols + 32 * (0.5 - prop_l)
+        self.ratings.set(guild_id, winner, nws)
+        self.ratings.set(guild_id, loser, nls)
+
+        print(f'{self.bot.user_cache.peek(winner, winner)} '
+              f'score change: {ows} -> {nws}')
+        print(f'{self.bot.user_cache.peek(loser, loser)} '
+              f'score change: {ols} -> {nls}')
         print('__________________')
 
-        with open('ranks.json', 'w') as file:
-            json.dump(self.ranks, file)
-            print('Ranks saved to \'ranks.json\'!')
-            print('__________________')
+    async def start_game(self, ctx, white, black, fen=None):
+        guild_games = self.guild_games.get(ctx.guild.id, ())
+        if self.max_guild_games is not None \
+                and len(guild_games) >= self.max_guild_games:
+            await ctx.send('This guild is already playing '
+                           f'{self.max_guild_games} games, finish one of '
+                           'them first!')
+            return
+
+        match = await self.new_game(white, black, ctx.guild.id,
+                                    ctx.guild.name, ctx.channel.id, fen)
+
+        msg = f'New match started: id `{match.game_id}`, ' \
+              f'<@{white}> (white) vs <@{black}> (black). ' \
+              f'Say `{self.bot.command_prefix}help move` ' \
+              f'to learn how to move!'
+
+        image = await self.render_pool.render(
+            match, flipped=not match.white_turn)
+        await ctx.send(msg, file=discord.File(image, 'board.png'))
+
+        if self.bot.user.id == (white if match.white_turn else black):
+            await self.engine_move(ctx, match)
+
+    async def send_move(self, ctx, match, user_id):
+        gameover, stalemate = match.status()
+
+        if user_id == match.white:
+            player_two = match.black
+        else:
+            player_two = match.white
+
+        if stalemate:
+            msg = f'<@{player_two}> and <@{user_id}> tied! ' \
+                  f'PGN:\n```{match.get_pgn()}```'
+            self.update_ranks(match.guild_id, stalemate, user_id, player_two)
+            self.end_game(match.game_id)
+
+        elif gameover:
+            msg = f'<@{player_two}> got checkmated, <@{user_id}> ' \
+                  f'wins! PGN:\n```{match.get_pgn()}```'
+            self.update_ranks(match.guild_id, stalemate, user_id, player_two)
+            self.end_game(match.game_id)
+
+        elif match.white_turn:
+            msg = 'Move executed! White turn:'
+        else:
+            msg = 'Move executed! Black turn:'
+
+        image = await self.render_pool.render(
+            match, flipped=not match.white_turn)
+        await ctx.send(msg, file=discord.File(image, 'board.png'))
+
+    async def engine_move(self, ctx, match):
+        # the search runs in another process on a copy of the board
+        bot_id = self.bot.user.id
+        time_limit = self.engine_times.get(match.guild_id, self.engine_time)
+        loop = asyncio.get_event_loop()
+
+        async with ctx.typing():
+            x, y, nx, ny, promote_to = await loop.run_in_executor(
+                self.engine_pool, best_move,
+                get_search_board(match.board), time_limit, self.engine_nodes)
+
+        # the game could have ended while the bot was thinking
+        if self.games.get(match.game_id) is not match:
+            return
+
+        self.play_move(match, bot_id, get_uci(x, y, nx, ny, promote_to))
+        await self.send_move(ctx, match, bot_id)
+
+    @staticmethod
+    def get_suggestions(match, notation):
+        suggestions = match.get_suggestions(notation)
+        if not suggestions:
+            return ''
+        return ' Did you mean ' \
+            + ', '.join(f'`{move}`' for move in suggestions) + '?'
 
     @staticmethod
-    async def timeout(ctx, guild_reqs, clr, cld):
+    async def timeout(ctx, guild_reqs, guild_setups, clr, cld):
         guild_reqs[clr] = cld
         await asyncio.sleep(60)
 
         if clr in guild_reqs and guild_reqs[clr] == cld:
             guild_reqs.pop(clr)
+            guild_setups.pop(clr, None)
             await ctx.send(f'Challenge by <@{clr}> timed out!')
 
+    async def send_challenge(self, ctx, user, fen=None):
+        author_id = ctx.author.id
+        guild_id = ctx.guild.id
+
+        guild_reqs = self.requests.setdefault(guild_id, {})
+        guild_setups = self.setups.setdefault(guild_id, {})
+
+        if author_id in guild_reqs and guild_reqs[author_id] == user.id:
+            await ctx.send('You\'re already challenging this user!')
+
+        elif author_id == user.id:
+            await ctx.send('You can\'t challenge yourself!')
+
+        elif user.id == self.bot.user.id:
+            # the bot accepts right away
+            self.bot.user_cache.put(ctx.author)
+            self.bot.user_cache.put(self.bot.user)
+
+            players = [author_id, user.id]
+            random.shuffle(players)
+            white, black = players
+            await self.start_game(ctx, white, black, fen)
+
+        else:
+            # the position waits with the challenge until it's accepted
+            guild_setups[author_id] = fen
+            await ctx.send(f'Challenging {user.name}! Say '
+                           f'`{self.bot.command_prefix}accept` to accept.')
+            await self.timeout(ctx, guild_reqs, guild_setups,
+                               author_id, user.id)
+
     @commands.command()
     async def challenge(self, ctx, user: discord.Member = None):
         """Request an user to play a game, must specify the user."""
@@ -128,27 +337,31 @@ class Game:
                            f'(ex: `{self.bot.command_prefix}challenge '
                            f'@{ctx.author}`)')
         else:
-            author_id = ctx.author.id
-            guild_id = ctx.guild.id
-
-            if guild_id not in self.requests:
-                self.requests[guild_id] = {}
-
-            guild_reqs = self.requests[guild_id]
-
-            if author_id in guild_reqs and guild_reqs[author_id] == user.id:
-                await ctx.send('You\'re already challenging this user!')
+            await self.send_challenge(ctx, user)
+
+    @commands.command(name='setup')
+    async def setup_game(self, ctx, user: discord.Member = None, *,
+                         fen: str = None):
+        """Request an user to play a game from a position, must specify
+        the user and the position in FEN
+        (Ex: `@user 4k3/8/8/8/8/8/4P3/4K3 w - - 0 1`)."""
+        if user is None or fen is None:
+            await ctx.send('You have to specify who you\'re challenging '
+                           'and the position! '
+                           f'(ex: `{self.bot.command_prefix}setup '
+                           f'@{ctx.author} 4k3/8/8/8/8/8/4P3/4K3 w - - 0 1`)')
+            return
 
-            elif author_id == user.id:
-                await ctx.send('You can\'t challenge yourself!')
-
-            elif user.id == self.bot.user.id:
-                await ctx.send('I don\'t know how to play chess (yet)!')
+        try:
+            board = Board.from_fen(fen)
+        except ValueError as exc:
+            await ctx.send(f'`{fen}` is not a valid position, {exc}!')
+            return
 
-            else:
-                await ctx.send(f'Challenging {user.name}! Say '
-                               f'`{self.bot.command_prefix}accept` to accept.')
-                await self.timeout(ctx, guild_reqs, author_id, user.id)
+        if board.result != '*':
+            await ctx.send('That game is already over!')
+        else:
+            await self.send_challenge(ctx, user, board.to_fen())
 
     @commands.command()
     async def accept(self, ctx):
@@ -156,10 +369,8 @@ class Game:
         user_id = ctx.author.id
         guild_id = ctx.guild.id
 
-        if guild_id not in self.requests:
-            self.requests[guild_id] = {}
-
-        guild_reqs = self.requests[guild_id]
+        guild_reqs = self.requests.setdefault(guild_id, {})
+        guild_setups = self.setups.setdefault(guild_id, {})
 
         if user_id not in guild_reqs.values():
             await ctx.send('You don\'t have any requests!')
@@ -167,28 +378,15 @@ class Game:
             for clr, cld in guild_reqs.copy().items():
                 if user_id == cld:
                     # start game
-                    if clr not in self.bot.usernames:
-                        self.bot.usernames[clr] = \
-                            await self.bot.get_user_info(clr)
-                    if cld not in self.bot.usernames:
-                        self.bot.usernames[cld] = ctx.author
+                    self.bot.user_cache.put(ctx.author)
 
                     players = [clr, cld]
                     random.shuffle(players)
                     white, black = players
 
-                    self.new_game(white, black, guild_id, ctx.guild.name)
                     guild_reqs.pop(clr)
-
-                    msg = f'New match started: id `{self.last_game_id}`, ' \
-                          f'<@{white}> (white) vs <@{black}> (black). ' \
-                          f'Say `{self.bot.command_prefix}help move` ' \
-                          f'to learn how to move!'
-
-                    board_normal, _ = \
-                        self.games[self.last_game_id].get_images()
-                    await ctx.send(
-                        msg, file=discord.File(board_normal, 'board.png'))
+                    fen = guild_setups.pop(clr, None)
+                    await self.start_game(ctx, white, black, fen)
 
     @commands.command()
     async def remember(self, ctx):
@@ -198,48 +396,57 @@ class Game:
             title=f'{ctx.author.name}\'s games',
             type='rich',
             colour=discord.Colour.magenta())
-        embed.description = f'You are playing {len(self.games)} games!'
+        user_games = [self.games[game_id]
+                      for game_id in sorted(self.user_games.get(user_id, ()))]
+        embed.description = f'You are playing {len(user_games)} games!'
+
+        users = await self.bot.user_cache.get_many(
+            player for game in user_games
+            for player in (game.white, game.black))
 
-        for _, game in self.games.items():
-            if user_id in (game.white, game.black):
-                value = f'`{self.bot.usernames[game.white]}(w) ' \
-                        f'vs {self.bot.usernames[game.black]}(b)`'
-                embed.add_field(
-                    name=f'game id: {game.game_id}',
-                    value=value,
-                    inline=False)
+        for game in user_games:
+            value = f'`{users[game.white]}(w) ' \
+                    f'vs {users[game.black]}(b)`'
+            embed.add_field(
+                name=f'game id: {game.game_id}',
+                value=value,
+                inline=False)
 
         await ctx.send(embed=embed)
 
     @commands.command(name='ranks')
-    async def rankings(self, ctx):
-        """Shows the ranks in your guild. Play a match to get a rank!"""
+    async def rankings(self, ctx, page: int = 1):
+        """Shows the ranks in your guild, 10 players per page.
+        Play a match to get a rank!"""
         guild_id = ctx.guild.id
+        start = (page - 1) * RANKS_PER_PAGE
+        entries, total = self.ratings.get_page(guild_id, start,
+                                               RANKS_PER_PAGE)
+        pages = max(1, math.ceil(total / RANKS_PER_PAGE))
 
-        if guild_id not in self.ranks:
-            self.ranks[guild_id] = {}
+        if not 1 <= page <= pages:
+            await ctx.send(f'There are only {pages} pages of ranks!')
+            return
 
-        guild_ranks = self.ranks[guild_id]
+        # only the names on this page are needed, fetched all at once
+        users = await self.bot.user_cache.get_many(
+            user_id for user_id, _ in entries)
 
-        for user_id in guild_ranks:
-            if user_id not in self.bot.usernames:
-                self.bot.usernames[user_id] = \
-                    await self.bot.get_user_info(user_id)
-
-        rank = 1
+        rank = start + 1
         embed = discord.Embed(
             title=f'{ctx.guild.name}\'s rankings',
             type='rich',
             colour=discord.Colour.magenta())
 
-        for user_id in sorted(guild_ranks, key=guild_ranks.get, reverse=True):
-            name = f'{rank}. {self.bot.usernames[user_id]}'
+        for user_id, rating in entries:
+            name = f'{rank}. {users[user_id]}'
             embed.add_field(
                 name=name,
-                value=f'`{int(guild_ranks[user_id])}`',
+                value=f'`{int(rating)}`',
                 inline=False)
             rank += 1
 
+        embed.set_footer(text=f'Page {page} of {pages}')
         await ctx.send(embed=embed)
 
     @commands.command()
@@ -250,19 +457,15 @@ class Game:
 
         if await self.verify_game(ctx, game_id, user_id, guild_id):
             match = self.games[game_id]
-            board_normal, board_flipped = match.get_images()
+            image = await self.render_pool.render(
+                match, flipped=user_id != match.white)
 
             if match.white_turn:
                 msg = 'White turn:'
             else:
                 msg = 'Black turn:'
 
-            if user_id == match.white:
-                await ctx.send(
-                    msg, file=discord.File(board_normal, 'board.png'))
-            else:
-                await ctx.send(
-                    msg, file=discord.File(board_flipped, 'board.png'))
+            await ctx.send(msg, file=discord.File(image, 'board.png'))
 
     @commands.command()
     async def surrender(self, ctx, game_id: int):
@@ -277,57 +480,26 @@ class Game:
                            f'PGN:\n```{match.get_pgn()}```')
 
             self.update_ranks(guild_id, False, winner, user_id)
-            self.games.pop(game_id)
+            self.end_game(game_id)
 
     @commands.command()
-    async def move(self, ctx,
-                   game_id: int,
-                   move_from: str,
-                   move_into: str,
-                   promotion: str=None):
-        """Make a move, must specify the game id as well as where
-        you're moving from and into (Ex: `a1 h8`, `c2 c4`).
+    async def move(self, ctx, game_id: int, *, notation: str):
+        """Make a move, must specify the game id as well as the move
+        (Ex: `e4`, `Nf3`, `O-O`, `exd5`, `e7e8q` or `c2 c4`).
         If you can promote, you must specify what piece you're promoting to
-        (`queen`, `knight`, `rook` or `bishop`)."""
+        (`e8=Q`, `e7e8n` or `e7 e8 rook`)."""
         user_id = ctx.author.id
         guild_id = ctx.guild.id
 
         if await self.verify_game(ctx, game_id, user_id, guild_id):
             match = self.games[game_id]
-            error = match.move(user_id, move_from, move_into, promotion)
+            error = self.play_move(match, user_id, notation)
 
             if not error:
-                board_normal, board_flipped = match.get_images()
-                gameover, stalemate = match.status()
-
-                if user_id == match.white:
-                    player_two = match.black
-                else:
-                    player_two = match.white
-
-                if stalemate:
-                    msg = f'<@{player_two}> and <@{user_id}> tied! ' \
-                          f'PGN:\n```{match.get_pgn()}```'
-                    self.update_ranks(guild_id, stalemate, user_id, player_two)
-                    self.games.pop(game_id)
-
-                elif gameover:
-                    msg = f'<@{player_two}> got checkmated, <@{user_id}> ' \
-                          f'wins! PGN:\n```{match.get_pgn()}```'
-                    self.update_ranks(guild_id, stalemate, user_id, player_two)
-                    self.games.pop(game_id)
-
-                elif match.white_turn:
-                    msg = 'Move executed! White turn:'
-                else:
-                    msg = 'Move executed! Black turn:'
-
-                if match.white_turn:
-                    await ctx.send(
-                        msg, file=discord.File(board_normal, 'board.png'))
-                else:
-                    await ctx.send(
-                        msg, file=discord.File(board_flipped, 'board.png'))
+                await self.send_move(ctx, match, user_id)
+                if not match.gameover \
+                        and self.bot.user.id in (match.white, match.black):
+                    await self.engine_move(ctx, match)
 
             elif error == 1:
                 # not the players turn
@@ -336,57 +508,88 @@ class Game:
             elif error == 2:
                 # wrote move incorrectly
                 await ctx.send(
-                    f'`{move_from} {move_into}` is not a valid move. '
+                    f'`{notation}` is not a valid move. '
                     'Moves are formatted like such: '
-                    '`d2 d4`, `b8 c6`, `a1 h8` etc.')
+                    '`d4`, `Nc6`, `O-O`, `d2d4` etc.'
+                    + self.get_suggestions(match, notation))
 
             elif error == 3:
                 # made an illegal move
-                await ctx.send(
-                    f'`{move_from} {move_into}` is an illegal move!')
+                await ctx.send(f'`{notation}` is an illegal move!'
+                               + self.get_suggestions(match, notation))
 
     @commands.command()
     async def takeback(self, ctx, game_id: int):
         """Request to undo the last move.
-        Both players have to agree to undo a move."""
+        Both players have to agree to undo a move, I never take moves back."""
         user_id = ctx.author.id
         guild_id = ctx.guild.id
 
         if await self.verify_game(ctx, game_id, user_id, guild_id):
             match = self.games[game_id]
-            if not match.takeback(user_id):
+            if self.bot.user.id in (match.white, match.black):
+                await ctx.send('I don\'t take moves back, '
+                               'every move against me counts!')
+            elif not match.takeback(user_id):
                 await ctx.send('You have requested a takeback!')
             else:
-                board_normal, board_flipped = match.get_images()
+                self.journal.remove_move(game_id, len(match.board.history))
                 if match.white_turn:
                     msg = 'Takeback accepted! White turn:'
                 else:
                     msg = 'Takeback accepted! Black turn:'
 
-                if match.white_turn:
-                    await ctx.send(
-                        msg, file=discord.File(board_normal, 'board.png'))
-                else:
-                    await ctx.send(
-                        msg, file=discord.File(board_flipped, 'board.png'))
+                image = await self.render_pool.render(
+                    match, flipped=not match.white_turn)
+                await ctx.send(msg, file=discord.File(image, 'board.png'))
 
     @commands.command()
     async def draw(self, ctx, game_id: int):
         """Offer the other player a draw
-        (or accept if an offer has already been made)."""
+        (or accept if an offer has already been made).
+        I never agree to draws, games against me are played out."""
         user_id = ctx.author.id
         guild_id = ctx.guild.id
 
         if await self.verify_game(ctx, game_id, user_id, guild_id):
             match = self.games[game_id]
-            if not match.draw(user_id):
+            if self.bot.user.id in (match.white, match.black):
+                await ctx.send('I decline the draw, let\'s play it out! '
+                               f'Say `{self.bot.command_prefix}surrender '
+                               f'{game_id}` to give up instead.')
+            elif not match.draw(user_id):
                 await ctx.send('You have requested a draw!')
             else:
                 await ctx.send(f'<@{match.black}> and <@{match.white}> '
                                f'have agreed a draw! '
                                f'PGN:\n```{match.get_pgn()}```')
                 self.update_ranks(guild_id, True, match.black, match.white)
-                self.games.pop(game_id)
+                self.end_game(game_id)
+
+    @commands.command()
+    async def enginetime(self, ctx, seconds: float = None):
+        """Show or set how many seconds I think per move in this guild.
+        Changing it requires the Manage Server permission."""
+        guild_id = ctx.guild.id
+
+        if seconds is None:
+            time_limit = self.engine_times.get(guild_id, self.engine_time)
+            await ctx.send(f'I think for `{time_limit}` seconds per move '
+                           'in this guild.')
+
+        elif not ctx.author.guild_permissions.manage_guild:
+            await ctx.send('You need the Manage Server permission '
+                           'to change how long I think!')
+
+        elif not 0.1 <= seconds <= 30:
+            await ctx.send('The time has to be between `0.1` and `30` '
+                           'seconds!')
+
+        else:
+            self.engine_times[guild_id] = seconds
+            self.journal.set_engine_time(guild_id, seconds)
+            await ctx.send(f'I will now think for `{seconds}` seconds '
+                           'per move in this guild.')
 
     @commands.command()
     async def pgn(self, ctx, game_id: int):
@@ -396,7 +599,7 @@ class Game:
 
         if await self.verify_game(ctx, game_id, user_id, guild_id):
             match = self.games[game_id]
-            if match.board.move_count > 0:
+            if match.board.pgn:
                 await ctx.send(f'```{match.get_pgn()}```')
 
 
@@ -0,0 +1,547 @@
+from .pieces.rook import Rook
+from .pieces.bishop import Bishop
+from .pieces.knight import Knight
+from .pieces.queen import Queen
+from .pieces.king import King
+from .pieces.pawn import Pawn
+from .zobrist import PIECE_KEYS, BLACK_TURN_KEY, EN_PASSANT_KEYS, \
+    CASTLING_KEYS
+from .fen import parse_fen, format_fen
+from .position import Position
+import itertools
+
+# squares are numbered like the chessboard lists: index = y * 8 + x,
+# so a8 is 0 and h1 is 63
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECES = (Pawn, Knight, Bishop, Rook, Queen, King)
+PIECE_TYPES = {piece.name: piece_type
+               for piece_type, piece in enumerate(PIECES)}
+LETTERS = ('', 'N', 'B', 'R', 'Q', 'K')
+PROMOTIONS = {'queen': QUEEN, 'rook': ROOK, 'bishop': BISHOP, 'knight': KNIGHT}
+TYPE_KEYS = {is_white: [PIECE_KEYS[is_white, piece.name] for piece in PIECES]
+             for is_white in (True, False)}
+
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+
+STRAIGHT = ((0, -1), (1, 0), (0, 1), (-1, 0))
+DIAGONAL = ((1, -1), (1, 1), (-1, 1), (-1, -1))
+
+
+def _step_table(offsets):
+    table = []
+    for y, x in itertools.product(range(8), repeat=2):
+        bitboard = 0
+        for dx, dy in offsets:
+            if 0 <= x+dx <= 7 and 0 <= y+dy <= 7:
+                bitboard |= 1 << ((y+dy) * 8 + x+dx)
+        table.append(bitboard)
+    return table
+
+
+def _ray_table(dx, dy):
+    table = []
+    for y, x in itertools.product(range(8), repeat=2):
+        bitboard = 0
+        count_x = x + dx
+        count_y = y + dy
+        while 0 <= count_x <= 7 and 0 <= count_y <= 7:
+            bitboard |= 1 << (count_y * 8 + count_x)
+            count_x += dx
+            count_y += dy
+        table.append(bitboard)
+    return table
+
+
+KNIGHT_ATTACKS = _step_table(
+    [(dx, dy) for dx, dy in itertools.permutations((-2, -1, 1, 2), 2)
+     if abs(dx) != abs(dy)])
+KING_ATTACKS = _step_table(
+    [(dx, dy) for dx, dy in itertools.product((-1, 0, 1), repeat=2)
+     if dx or dy])
+PAWN_ATTACKS = {
+    True: _step_table([(-1, -1), (1, -1)]),
+    False: _step_table([(-1, 1), (1, 1)])
+}
+
+# (ray table, whether the ray goes towards higher square numbers)
+STRAIGHT_RAYS = [(_ray_table(dx, dy), dy > 0 or (dy == 0 and dx > 0))
+                 for dx, dy in STRAIGHT]
+DIAGONAL_RAYS = [(_ray_table(dx, dy), dy > 0) for dx, dy in DIAGONAL]
+
+LIGHT_SQUARES = sum(1 << square for square in range(64)
+                    if (square // 8 + square % 8) % 2 == 0)
+
+# castling rights that survive a move touching each square
+CASTLING_MASK = [15] * 64
+CASTLING_MASK[60] = 15 ^ (WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASK[63] = 15 ^ WHITE_KINGSIDE
+CASTLING_MASK[56] = 15 ^ WHITE_QUEENSIDE
+CASTLING_MASK[4] = 15 ^ (BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_MASK[7] = 15 ^ BLACK_KINGSIDE
+CASTLING_MASK[0] = 15 ^ BLACK_QUEENSIDE
+
+
+def slider_attacks(square, occupied, rays):
+    attacks = 0
+    for table, positive in rays:
+        ray = table[square]
+        blockers = ray & occupied
+        if blockers:
+            # the ray stops at the closest blocker, included
+            if positive:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= table[blocker]
+        attacks |= ray
+    return attacks
+
+
+def squares(bitboard):
+    while bitboard:
+        lowest = bitboard & -bitboard
+        yield lowest.bit_length() - 1
+        bitboard ^= lowest
+
+
+class BitBoard(Position):
+    def __init__(self):
+        super().__init__()
+        self.castling = WHITE_KINGSIDE | WHITE_QUEENSIDE \
+            | BLACK_KINGSIDE | BLACK_QUEENSIDE
+        self.en_passant = None
+        self.pieces = {True: [0] * 6, False: [0] * 6}
+        self.occupied = {True: 0, False: 0}
+        self.squares = [None] * 64
+        self.zobrist = CASTLING_KEYS[self.castling]
+
+        # initial position
+        back_rank = (ROOK, KNIGHT, BISHOP, QUEEN, KING, BISHOP, KNIGHT, ROOK)
+        for x, piece_type in enumerate(back_rank):
+            self.put(x, False, piece_type)
+            self.put(8 + x, False, PAWN)
+            self.put(48 + x, True, PAWN)
+            self.put(56 + x, True, piece_type)
+
+        # initial legal moves and repetition count
+        self.legal_moves = self.generate_legal_moves()
+        self.positions = {self.zobrist: 1}
+
+    @classmethod
+    def from_board(cls, board):
+        # copy of a Board position, with what's needed to spot repetitions
+        position = cls()
+        for square in range(64):
+            if position.squares[square] is not None:
+                position.remove(square)
+
+        for y, x in itertools.product(range(8), repeat=2):
+            piece = board.chessboard[y][x]
+            if piece is not None:
+                position.put(y * 8 + x, piece.is_white,
+                             PIECES.index(type(piece)))
+
+        position.white_turn = board.white_turn
+        position.castling = board.get_castling_rights()
+        if board.en_passant:
+            position.en_passant = board.en_passant_y * 8 + board.en_passant_x
+        position.move_count = board.move_count
+        position.halfmove_clock = board.halfmove_clock
+        position.is_checked = board.is_checked
+        position.has_moves = board.has_moves
+        position.result = board.result
+        position.zobrist = position.get_zobrist()
+        position.positions = dict(board.positions)
+        position.legal_moves = position.generate_legal_moves()
+        return position
+
+    @classmethod
+    def from_fen(cls, fen):
+        # a board with any legal position, raises ValueError for bad FENs
+        rows, white_turn, castling, en_passant, halfmove_clock, fullmove = \
+            parse_fen(fen)
+        position = cls()
+        for square in range(64):
+            if position.squares[square] is not None:
+                position.remove(square)
+
+        for y, x in itertools.product(range(8), repeat=2):
+            if rows[y][x] is not None:
+                is_white, name = rows[y][x]
+                position.put(y * 8 + x, is_white, PIECE_TYPES[name])
+
+        # the side that just moved can't have left its king in check
+        if position.attacked(position.king_square(not white_turn),
+                             white_turn):
+            raise ValueError('the side that just moved is in check')
+
+        position.white_turn = white_turn
+        position.castling = castling
+        position.en_passant = en_passant
+        position.halfmove_clock = halfmove_clock
+        position.move_count = fullmove - 1 if white_turn else fullmove
+        position.zobrist = position.get_zobrist()
+        position.positions = {position.zobrist: 1}
+        position.legal_moves = position.generate_legal_moves()
+        position.is_checked = position.check()
+        position.has_moves = position.has_legal_move()
+        position.adjudicate()
+        return position
+
+    def to_fen(self):
+        rows = [[None] * 8 for _ in range(8)]
+        for square, content in enumerate(self.squares):
+            if content is not None:
+                is_white, piece_type = content
+                rows[square // 8][square % 8] = \
+                    (is_white, PIECES[piece_type].name)
+        fullmove = self.move_count + 1 if self.white_turn else self.move_count
+        return format_fen(rows, self.white_turn, self.castling,
+                          self.en_passant, self.halfmove_clock, fullmove)
+
+    @property
+    def chessboard(self):
+        # piece objects for code that works with Board.chessboard
+        chessboard = [[None for _ in range(8)] for _ in range(8)]
+        for square, content in enumerate(self.squares):
+            if content is None:
+                continue
+            is_white, piece_type = content
+            y, x = divmod(square, 8)
+            if piece_type == PAWN:
+                has_moved = y != (6 if is_white else 1)
+            elif piece_type == KING:
+                rights = (WHITE_KINGSIDE | WHITE_QUEENSIDE) if is_white \
+                    else (BLACK_KINGSIDE | BLACK_QUEENSIDE)
+                has_moved = not self.castling & rights
+            elif piece_type == ROOK:
+                has_moved = CASTLING_MASK[square] & self.castling \
+                    == self.castling
+            else:
+                has_moved = True
+            chessboard[y][x] = PIECES[piece_type](is_white, has_moved)
+        return chessboard
+
+    def put(self, square, is_white, piece_type):
+        self.pieces[is_white][piece_type] |= 1 << square
+        self.occupied[is_white] |= 1 << square
+        self.squares[square] = (is_white, piece_type)
+        self.zobrist ^= TYPE_KEYS[is_white][piece_type][square]
+
+    def remove(self, square):
+        is_white, piece_type = self.squares[square]
+        self.pieces[is_white][piece_type] ^= 1 << square
+        self.occupied[is_white] ^= 1 << square
+        self.squares[square] = None
+        self.zobrist ^= TYPE_KEYS[is_white][piece_type][square]
+
+    def get_en_passant_key(self):
+        # the file only counts when a pawn is there to take en passant
+        if self.en_passant is not None and \
+                PAWN_ATTACKS[not self.white_turn][self.en_passant] \
+                & self.pieces[self.white_turn][PAWN]:
+            return EN_PASSANT_KEYS[self.en_passant % 8]
+        return 0
+
+    def get_zobrist(self):
+        zobrist = CASTLING_KEYS[self.castling] ^ self.get_en_passant_key()
+        if not self.white_turn:
+            zobrist ^= BLACK_TURN_KEY
+
+        for square, content in enumerate(self.squares):
+            if content is not None:
+                is_white, piece_type = content
+                zobrist ^= TYPE_KEYS[is_white][piece_type][square]
+        return zobrist
+
+    def king_square(self, is_white):
+        return self.pieces[is_white][KING].bit_length() - 1
+
+    def attacked(self, square, by_white):
+        pieces = self.pieces[by_white]
+        occupied = self.occupied[True] | self.occupied[False]
+        return bool(
+            KNIGHT_ATTACKS[square] & pieces[KNIGHT]
+            or KING_ATTACKS[square] & pieces[KING]
+            or PAWN_ATTACKS[not by_white][square] & pieces[PAWN]
+            or slider_attacks(square, occupied, DIAGONAL_RAYS)
+            & (pieces[BISHOP] | pieces[QUEEN])
+            or slider_attacks(square, occupied, STRAIGHT_RAYS)
+            & (pieces[ROOK] | pieces[QUEEN]))
+
+    def check(self):
+        return self.attacked(self.king_square(self.white_turn),
+                             not self.white_turn)
+
+    def generate_pseudo_moves(self):
+        # moves are (from, to, promotion) tuples of square numbers
+        us = self.white_turn
+        pieces = self.pieces[us]
+        own = self.occupied[us]
+        enemy = self.occupied[not us]
+        occupied = own | enemy
+
+        if us:
+            forward, start_rank, last_rank = -8, 6, 0
+        else:
+            forward, start_rank, last_rank = 8, 1, 7
+
+        for origin in squares(pieces[PAWN]):
+            targets = PAWN_ATTACKS[us][origin] & enemy
+            if self.en_passant is not None:
+                targets |= PAWN_ATTACKS[us][origin] & (1 << self.en_passant)
+            push = origin + forward
+            if not occupied >> push & 1:
+                targets |= 1 << push
+                if origin // 8 == start_rank \
+                        and not occupied >> (push + forward) & 1:
+                    targets |= 1 << (push + forward)
+            for target in squares(targets):
+                if target // 8 == last_rank:
+                    for promotion in (QUEEN, ROOK, BISHOP, KNIGHT):
+                        yield origin, target, promotion
+                else:
+                    yield origin, target, None
+
+        for origin in squares(pieces[KNIGHT]):
+            for target in squares(KNIGHT_ATTACKS[origin] & ~own):
+                yield origin, target, None
+
+        for origin in squares(pieces[BISHOP] | pieces[QUEEN]):
+            attacks = slider_attacks(origin, occupied, DIAGONAL_RAYS)
+            for target in squares(attacks & ~own):
+                yield origin, target, None
+
+        for origin in squares(pieces[ROOK] | pieces[QUEEN]):
+            attacks = slider_attacks(origin, occupied, STRAIGHT_RAYS)
+            for target in squares(attacks & ~own):
+                yield origin, target, None
+
+        origin = self.king_square(us)
+        for target in squares(KING_ATTACKS[origin] & ~own):
+            yield origin, target, None
+
+        # castling, the rights imply the king and rook are at home
+        if us:
+            kingside, queenside = WHITE_KINGSIDE, WHITE_QUEENSIDE
+        else:
+            kingside, queenside = BLACK_KINGSIDE, BLACK_QUEENSIDE
+
+        if self.castling & (kingside | queenside) \
+                and not self.attacked(origin, not us):
+            if self.castling & kingside \
+                    and not occupied & (0b11 << (origin + 1)) \
+                    and not self.attacked(origin + 1, not us) \
+                    and not self.attacked(origin + 2, not us):
+                yield origin, origin + 2, None
+            if self.castling & queenside \
+                    and not occupied & (0b111 << (origin - 3)) \
+                    and not self.attacked(origin - 1, not us) \
+                    and not self.attacked(origin - 2, not us):
+                yield origin, origin - 2, None
+
+    def generate_legal_moves(self):
+        moves = []
+        us = self.white_turn
+        for move in self.generate_pseudo_moves():
+            record = self.push(move)
+            if not self.attacked(self.king_square(us), not us):
+                moves.append(move)
+            self.pop(record)
+        return moves
+
+    def push(self, move):
+        origin, target, promotion = move
+        us, piece_type = self.squares[origin]
+        captured_square = target
+        if piece_type == PAWN and target == self.en_passant:
+            captured_square = target + 8 if us else target - 8
+        captured = self.squares[captured_square]
+        record = (move, piece_type, captured, captured_square,
+                  self.castling, self.en_passant, self.zobrist)
+        self.zobrist ^= CASTLING_KEYS[self.castling] \
+            ^ self.get_en_passant_key() ^ BLACK_TURN_KEY
+
+        if captured is not None:
+            self.remove(captured_square)
+        self.remove(origin)
+        self.put(target, us, piece_type if promotion is None else promotion)
+
+        if piece_type == KING and target - origin == 2:
+            self.remove(origin + 3)
+            self.put(origin + 1, us, ROOK)
+        elif piece_type == KING and target - origin == -2:
+            self.remove(origin - 4)
+            self.put(origin - 1, us, ROOK)
+
+        self.castling &= CASTLING_MASK[origin] & CASTLING_MASK[target]
+        if piece_type == PAWN and abs(target - origin) == 16:
+            self.en_passant = (origin + target) // 2
+        else:
+            self.en_passant = None
+        self.white_turn = not us
+        self.zobrist ^= CASTLING_KEYS[self.castling] \
+            ^ self.get_en_passant_key()
+        return record
+
+    def pop(self, record):
+        move, piece_type, captured, captured_square, \
+            self.castling, self.en_passant, zobrist = record
+        origin, target, _ = move
+        self.white_turn = us = not self.white_turn
+
+        self.remove(target)
+        self.put(origin, us, piece_type)
+
+        if piece_type == KING and target - origin == 2:
+            self.remove(origin + 1)
+            self.put(origin + 3, us, ROOK)
+        elif piece_type == KING and target - origin == -2:
+            self.remove(origin - 1)
+            self.put(origin - 4, us, ROOK)
+
+        if captured is not None:
+            self.put(captured_square, *captured)
+        self.zobrist = zobrist
+
+    def find_move(self, x, y, nx, ny, promote_to):
+        origin = y * 8 + x
+        target = ny * 8 + nx
+        promotion = PROMOTIONS.get(promote_to)
+        for move in self.legal_moves:
+            if move[0] == origin and move[1] == target \
+                    and (move[2] is None or move[2] == promotion):
+                return move
+        return None
+
+    def gatekeeper(self, x, y, nx, ny, review_mode, promote_to=None):
+        move = self.find_move(x, y, nx, ny, promote_to)
+        legal = move is not None
+
+        if not review_mode and legal:
+            self.execute(x, y, nx, ny, move[2])
+
+        return legal
+
+    def get_san(self, origin, target, promotion):
+        piece_type = self.squares[origin][1]
+        destination = 'abcdefgh'[target % 8] + '87654321'[target // 8]
+
+        if piece_type == KING and target - origin == 2:
+            return 'O-O'
+        elif piece_type == KING and target - origin == -2:
+            return 'O-O-O'
+
+        if piece_type == PAWN:
+            if origin % 8 != target % 8:
+                destination = 'abcdefgh'[origin % 8] + 'x' + destination
+            if promotion is not None:
+                destination += '=' + LETTERS[promotion]
+            return destination
+
+        if self.squares[target] is not None:
+            destination = 'x' + destination
+
+        # other pieces of the same type that could go to the same square
+        others = [o for o, t, _ in self.legal_moves
+                  if t == target and o != origin
+                  and self.squares[o][1] == piece_type]
+        details = ''
+        if others:
+            if all(o % 8 != origin % 8 for o in others):
+                details = 'abcdefgh'[origin % 8]
+            elif all(o // 8 != origin // 8 for o in others):
+                details = '87654321'[origin // 8]
+            else:
+                details = 'abcdefgh'[origin % 8] + '87654321'[origin // 8]
+        return LETTERS[piece_type] + details + destination
+
+    def get_check_mark(self, move):
+        record = self.push(move)
+        check_mark = ''
+        if self.check():
+            check_mark = '+' if self.generate_legal_moves() else '#'
+        self.pop(record)
+        return check_mark
+
+    def get_full_moves(self):
+        # every legal move, promotions apart, as the move used here and as
+        # (x, y, nx, ny, promote_to)
+        for move in self.legal_moves:
+            origin, target, promotion = move
+            promote_to = None
+            if promotion is not None:
+                promote_to = PIECES[promotion].name
+            yield move, (origin % 8, origin // 8,
+                         target % 8, target // 8, promote_to)
+
+    def execute(self, x, y, nx, ny, promote_to):
+        if isinstance(promote_to, str):
+            promote_to = PROMOTIONS.get(promote_to)
+        if self.squares[y * 8 + x][1] != PAWN or ny not in (0, 7):
+            promote_to = None
+
+        move = (y * 8 + x, ny * 8 + nx, promote_to)
+        san = self.get_san(*move)
+        record = self.push(move)
+        self.history.append((record,
+                             self.move_count,
+                             self.halfmove_clock,
+                             self.is_checked,
+                             self.has_moves,
+                             self.result))
+
+        # pawn moves and captures reset the fifty-move rule count
+        _, piece_type, captured = record[:3]
+        material_changed = captured is not None or promote_to is not None
+        if piece_type == PAWN or captured is not None:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        self.add_position()
+        move_number = self.count_move(not self.white_turn)
+
+        self.legal_moves = self.generate_legal_moves()
+        self.is_checked = self.check()
+        self.has_moves = self.has_legal_move()
+        self.finish_move(move_number + san, material_changed)
+
+    def undo(self):
+        if len(self.history) > 0:
+            record,\
+                self.move_count,\
+                self.halfmove_clock,\
+                self.is_checked,\
+                self.has_moves,\
+                self.result = self.history.pop()
+
+            self.forget_move()
+            self.pop(record)
+            self.legal_moves = self.generate_legal_moves()
+
+    def insufficient_material(self):
+        white = self.pieces[True]
+        black = self.pieces[False]
+        if white[PAWN] | white[ROOK] | white[QUEEN] \
+                | black[PAWN] | black[ROOK] | black[QUEEN]:
+            return False
+
+        # a lone minor piece, or bishops that all share a square color
+        knights = white[KNIGHT] | black[KNIGHT]
+        bishops = white[BISHOP] | black[BISHOP]
+        if not bishops:
+            return knights & (knights - 1) == 0
+        return not knights and (not bishops & LIGHT_SQUARES
+                                or not bishops & ~LIGHT_SQUARES)
+
+    def get_legal_moves(self):
+        # one entry per from/to pair, like Board.get_legal_moves
+        moves = []
+        for origin, target, promotion in self.legal_moves:
+            if promotion in (None, QUEEN):
+                moves.append((origin % 8, origin // 8,
+                              target % 8, target // 8))
+        return moves
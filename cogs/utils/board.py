@@ -4,25 +4,32 @@ from .pieces.knight import Knight
 from .pieces.queen import Queen
 from .pieces.king import King
 from .pieces.pawn import Pawn
+from .zobrist import PIECE_KEYS, BLACK_TURN_KEY, EN_PASSANT_KEYS, \
+    CASTLING_KEYS
+from .fen import CASTLING, PIECE_LETTERS, parse_fen, format_fen
+from .position import Position
+from typing import Dict, List, Set, Tuple
 import itertools
-import copy
 
+PIECE_CLASSES = {piece.name: piece
+                 for piece in (Pawn, Knight, Bishop, Rook, Queen, King)}
+PROMOTIONS = ('queen', 'rook', 'bishop', 'knight')
 
-class Board:
+
+class Board(Position):
     def __init__(self):
-        # game settings
-        self.pgn = ''
-        self.result = '*'
-        self.move_count = 0
-        self.history = []
-        self.is_checked = False
-        self.has_moves = True
-        self.white_turn = True
+        super().__init__()
         self.en_passant = False
         self.en_passant_x = -1
         self.en_passant_y = -1
         self.white_controlled = None
         self.black_controlled = None
+        self.attacks = None
+        self.attackers = None
+        self.king_squares = {True: (7, 4), False: (0, 4)}
+        self.checkers = []
+        self.check_ray = set()
+        self.pins = {}  # type: Dict[Tuple[int, int], Set[Tuple[int, int]]]
         self.chessboard = [[None for _ in range(8)] for _ in range(8)]
 
         # initial position
@@ -62,11 +69,75 @@ class Board:
         self.chessboard[6][6] = Pawn(True)
         self.chessboard[6][7] = Pawn(True)
 
-        # iniial controlled squares
+        # iniial controlled squares and legal moves
         self.update_controlled()
+        self.update_pins()
+        self.legal_moves = self.generate_legal_moves()
+
+        # key that identifies the position, and how many times each
+        # position has been seen for repetitions
+        self.zobrist = self.get_zobrist()
+        self.positions = {self.zobrist: 1}
+
+    @classmethod
+    def from_fen(cls, fen):
+        # a board with any legal position, raises ValueError for bad FENs
+        rows, white_turn, castling, en_passant, halfmove_clock, fullmove = \
+            parse_fen(fen)
+        board = cls()
+
+        for y, x in itertools.product(range(8), repeat=2):
+            board.chessboard[y][x] = None
+            if rows[y][x] is not None:
+                is_white, name = rows[y][x]
+                has_moved = name != 'pawn' or y != (6 if is_white else 1)
+                board.chessboard[y][x] = \
+                    PIECE_CLASSES[name](is_white, has_moved)
+                if name == 'king':
+                    board.king_squares[is_white] = (y, x)
+
+        # castling rights live in the has_moved flags of kings and rooks
+        for bit, (_, y, x, _) in enumerate(CASTLING):
+            if castling >> bit & 1:
+                board.chessboard[y][4].has_moved = False
+                board.chessboard[y][x].has_moved = False
+
+        board.en_passant = en_passant is not None
+        if board.en_passant:
+            board.en_passant_y, board.en_passant_x = divmod(en_passant, 8)
+        board.halfmove_clock = halfmove_clock
+        board.move_count = fullmove - 1 if white_turn else fullmove
+        board.update_controlled()
+
+        # the side that just moved can't have left its king in check
+        board.white_turn = not white_turn
+        if board.check():
+            raise ValueError('the side that just moved is in check')
+        board.white_turn = white_turn
+
+        board.update_pins()
+        board.is_checked = board.check()
+        board.legal_moves = board.generate_legal_moves()
+        board.has_moves = board.has_legal_move()
+        board.zobrist = board.get_zobrist()
+        board.positions = {board.zobrist: 1}
+        board.adjudicate()
+        return board
+
+    def to_fen(self):
+        rows = [[None if piece is None else (piece.is_white, piece.name)
+                 for piece in row] for row in self.chessboard]
+        if self.en_passant:
+            en_passant = self.en_passant_y * 8 + self.en_passant_x
+        else:
+            en_passant = None
+        fullmove = self.move_count + 1 if self.white_turn else self.move_count
+        return format_fen(rows, self.white_turn, self.get_castling_rights(),
+                          en_passant, self.halfmove_clock, fullmove)
 
     def gatekeeper(self, x, y, nx, ny, review_mode, promote_to=None):
         legal = True
+        en_passant = False
         piece = self.chessboard[y][x]
         destination = self.chessboard[ny][nx]
 
@@ -92,6 +163,7 @@ class Board:
             elif legal and self.en_passant and isinstance(piece, Pawn) \
                     and nx == self.en_passant_x and ny == self.en_passant_y:
                 legal = piece.can_move(x, y, nx, ny, True)
+                en_passant = legal
 
             #  all normal moves
             elif legal and not piece.can_move(
@@ -113,23 +185,26 @@ class Board:
                     and self.white_controlled[ny][nx]:
                 legal = False
 
+            # en passant also takes the captured pawn off the king's rank,
+            # diagonal or checking square, so it's tried out on the board
+            if legal and en_passant:
+                legal = not self.exposes_king(x, y, nx, ny)
+
             # check that we're not moving pinned pieces
-            if legal and not isinstance(piece, King) \
-                    and self.check_laser(x, y, nx, ny):
+            elif legal and (y, x) in self.pins \
+                    and (ny, nx) not in self.pins[y, x]:
                 legal = False
 
             # check if the player can promote
             if legal and isinstance(piece, Pawn) \
                     and ((self.white_turn and ny == 0) or
                          (not self.white_turn and ny == 7)):
-                legal = promote_to in ('queen', 'rook', 'bishop', 'knight')
+                legal = promote_to in PROMOTIONS
             else:
                 promote_to = None
 
             # if the player is in check, see if he manages to get out of check
-            if legal and self.is_checked:
-                attacking_pieces = self.get_attacking()
-
+            if legal and self.is_checked and not en_passant:
                 # moving outside of check
                 if isinstance(piece, King):
                     if self.white_turn and self.black_controlled[ny][nx]:
@@ -139,19 +214,12 @@ class Board:
 
                 # if the king is being attacked by more than one piece
                 # there's no way to block or take both of them
-                elif len(attacking_pieces) > 1:
+                elif len(self.checkers) > 1:
                     legal = False
 
-                # take the attacking piece
-                elif destination is not None:
-                    if (ny, nx) != attacking_pieces[0]:
-                        legal = False
-
-                # block the attacking piece
-                elif destination is None:
-                    ty, tx = attacking_pieces[0]
-                    if (ny, nx) not in self.check_block(tx, ty):
-                        legal = False
+                # take or block the attacking piece
+                elif (ny, nx) not in self.check_ray:
+                    legal = False
 
         if not review_mode and legal:
             self.execute(x, y, nx, ny, promote_to)
@@ -159,94 +227,117 @@ class Board:
         return legal
 
     def execute(self, x, y, nx, ny, promote_to):
-        game_state = (copy.deepcopy(self.chessboard),
-                      self.white_turn,
-                      self.en_passant,
-                      self.en_passant_x,
-                      self.en_passant_y,
-                      self.move_count,
-                      self.is_checked,
-                      self.has_moves,
-                      self.pgn)
-        self.history.append(game_state)
-
-        move = 'abcdefgh'[nx] + '87654321'[ny]
-        details = self.get_details(x, y, nx, ny)
-        pawn_pos = ''
-        promotion = ''
-        status = ''
-        castle = None
+        san = self.get_san(x, y, nx, ny, promote_to)
+
+        # castling rights and en passant are taken out of the key before
+        # the move and added back once it's done
+        zobrist = self.zobrist \
+            ^ CASTLING_KEYS[self.get_castling_rights()] \
+            ^ self.get_en_passant_key() \
+            ^ BLACK_TURN_KEY
+        record = self.push((x, y, nx, ny, promote_to))
+        self.history.append((record,
+                             self.move_count,
+                             self.halfmove_clock,
+                             self.is_checked,
+                             self.has_moves,
+                             self.result,
+                             self.zobrist))
+
+        # move the pieces in the key
+        piece, _, captured, captured_x, captured_y = record[4:9]
+        zobrist ^= PIECE_KEYS[piece.is_white, piece.name][y * 8 + x] \
+            ^ PIECE_KEYS[piece.is_white, promote_to or piece.name][
+                ny * 8 + nx]
+        if captured is not None:
+            zobrist ^= PIECE_KEYS[captured.is_white, captured.name][
+                captured_y * 8 + captured_x]
+        if isinstance(piece, King) and abs(nx-x) == 2:
+            if nx-x == 2:
+                rook_x, rook_nx = nx+1, nx-1
+            else:
+                rook_x, rook_nx = nx-2, nx+1
+            zobrist ^= PIECE_KEYS[piece.is_white, 'rook'][y * 8 + rook_x] \
+                ^ PIECE_KEYS[piece.is_white, 'rook'][y * 8 + rook_nx]
 
-        if self.chessboard[ny][nx] is not None:
-            if isinstance(self.chessboard[y][x], Pawn):
-                pawn_pos = 'abcdefgh'[x]
-            take = 'x'
-        else:
-            take = ''
-
-        if isinstance(self.chessboard[y][x], King):
-            piece = ' K'
-        elif isinstance(self.chessboard[y][x], Queen):
-            piece = ' Q'
-        elif isinstance(self.chessboard[y][x], Knight):
-            piece = ' N'
-        elif isinstance(self.chessboard[y][x], Bishop):
-            piece = ' B'
-        elif isinstance(self.chessboard[y][x], Rook):
-            piece = ' R'
+        # pawn moves and captures reset the fifty-move rule count
+        if isinstance(piece, Pawn) or captured is not None:
+            self.halfmove_clock = 0
         else:
-            piece = ' '
+            self.halfmove_clock += 1
+
+        move_number = self.count_move(not self.white_turn)
+        self.zobrist = zobrist \
+            ^ CASTLING_KEYS[self.get_castling_rights()] \
+            ^ self.get_en_passant_key()
+        self.add_position()
+        self.update_pins()
+        self.is_checked = self.check()
+        self.legal_moves = self.generate_legal_moves()
+        self.has_moves = self.has_legal_move()
+
+        self.finish_move(move_number + san,
+                         captured is not None or promote_to is not None)
 
-        if isinstance(self.chessboard[y][x], King):
+    def undo(self):
+        if len(self.history) > 0:
+            record,\
+                self.move_count,\
+                self.halfmove_clock,\
+                self.is_checked,\
+                self.has_moves,\
+                self.result,\
+                zobrist = self.history.pop()
+
+            self.forget_move()
+            self.zobrist = zobrist
+            self.pop(record)
+            self.update_pins()
+            self.legal_moves = self.generate_legal_moves()
+
+    def push(self, move):
+        # moves the pieces and their attacks, and returns only what is
+        # needed to reverse the move
+        x, y, nx, ny, promote_to = move
+        piece = self.chessboard[y][x]
+        captured_x = nx
+        captured_y = ny
+        if self.en_passant and isinstance(piece, Pawn) \
+                and ny == self.en_passant_y and nx == self.en_passant_x:
+            captured_y = y
+        record = (x, y, nx, ny,
+                  piece,
+                  piece.has_moved,
+                  self.chessboard[captured_y][captured_x],
+                  captured_x,
+                  captured_y,
+                  self.white_turn,
+                  self.en_passant,
+                  self.en_passant_x,
+                  self.en_passant_y)
+
+        changed = [(x, y), (nx, ny), (captured_x, captured_y)]
+        if isinstance(piece, King):
+            self.king_squares[piece.is_white] = (ny, nx)
             if nx-x == 2:
                 self.chessboard[y][nx-1] = self.chessboard[y][nx+1]
                 self.chessboard[y][nx+1] = None
-                castle = 'O-O'
+                changed += [(nx+1, y), (nx-1, y)]
 
             elif nx-x == -2:
                 self.chessboard[y][nx+1] = self.chessboard[y][nx-2]
                 self.chessboard[y][nx-2] = None
-                castle = 'O-O-O'
+                changed += [(nx-2, y), (nx+1, y)]
 
-        if self.en_passant and isinstance(self.chessboard[y][x], Pawn) \
-                and ny == self.en_passant_y and nx == self.en_passant_x:
-            pawn_pos = 'abcdefgh'[x]
-            take = 'x'
-            if self.white_turn:
-                self.chessboard[ny+1][nx] = None
-            else:
-                self.chessboard[ny-1][nx] = None
+        if captured_y != ny:
+            self.chessboard[captured_y][captured_x] = None
 
         if promote_to is not None:
-            if promote_to == 'queen':
-                promotion = '=Q'
-                self.chessboard[ny][nx] = Queen(self.white_turn)
-
-            elif promote_to == 'knight':
-                promotion = '=N'
-                self.chessboard[ny][nx] = Knight(self.white_turn)
-
-            elif promote_to == 'bishop':
-                promotion = '=B'
-                self.chessboard[ny][nx] = Bishop(self.white_turn)
-
-            elif promote_to == 'rook':
-                promotion = '=R'
-                self.chessboard[ny][nx] = Rook(self.white_turn)
-
+            self.chessboard[ny][nx] = \
+                PIECE_CLASSES[promote_to](self.white_turn)
         else:
-            promotion = ''
-            self.chessboard[y][x].has_moved = True
-            self.chessboard[ny][nx] = self.chessboard[y][x]
-
-        if self.white_turn:
-            self.move_count += 1
-            if self.move_count > 1:
-                move_number = f' {self.move_count}.'
-            else:
-                move_number = f'{self.move_count}.'
-        else:
-            move_number = ''
+            piece.has_moved = True
+            self.chessboard[ny][nx] = piece
 
         if self.en_passant:
             self.en_passant = False
@@ -262,101 +353,177 @@ class Board:
 
         self.white_turn = not self.white_turn
         self.chessboard[y][x] = None
-        self.update_controlled()
-        self.is_checked = self.check()
-        self.has_moves = self.has_legal_move()
-
-        if self.is_checked and not self.has_moves:
-            if self.white_turn:
-                status = '# { Black wins by checkmate. } 0-1'
-                self.result = '0-1'
+        self.update_attacks(changed)
+        return record
+
+    def pop(self, record):
+        x, y, nx, ny,\
+            piece,\
+            has_moved,\
+            captured,\
+            captured_x,\
+            captured_y,\
+            self.white_turn,\
+            self.en_passant,\
+            self.en_passant_x,\
+            self.en_passant_y = record
+
+        # put the rook back if the move was castling
+        changed = [(x, y), (nx, ny), (captured_x, captured_y)]
+        if isinstance(piece, King) and nx-x == 2:
+            self.chessboard[y][nx+1] = self.chessboard[y][nx-1]
+            self.chessboard[y][nx-1] = None
+            changed += [(nx+1, y), (nx-1, y)]
+        elif isinstance(piece, King) and nx-x == -2:
+            self.chessboard[y][nx-2] = self.chessboard[y][nx+1]
+            self.chessboard[y][nx+1] = None
+            changed += [(nx-2, y), (nx+1, y)]
+
+        if isinstance(piece, King):
+            self.king_squares[piece.is_white] = (y, x)
+        piece.has_moved = has_moved
+        self.chessboard[ny][nx] = None
+        self.chessboard[y][x] = piece
+        self.chessboard[captured_y][captured_x] = captured
+        self.update_attacks(changed)
+
+    def insufficient_material(self):
+        knights = 0
+        bishop_colors = set()
+        for y, x in itertools.product(range(8), repeat=2):
+            piece = self.chessboard[y][x]
+            if piece is None or isinstance(piece, King):
+                continue
+            if isinstance(piece, Knight):
+                knights += 1
+            elif isinstance(piece, Bishop):
+                bishop_colors.add((x + y) % 2)
             else:
-                status = '# { White wins by checkmate. } 1-0'
-                self.result = '1-0'
-
-        elif self.is_checked:
-            status = '+'
-        elif not self.is_checked and not self.has_moves:
-            self.result = '1/2-1/2'
-            status = ' { Draw by stalemate. } 1/2-1/2'
-
-        if castle is None:
-            self.pgn += move_number + piece + details + pawn_pos \
-                        + take + move + promotion + status
+                return False
+
+        # a lone minor piece, or bishops that all share a square color
+        return (knights == 0 and len(bishop_colors) <= 1) \
+            or (knights == 1 and len(bishop_colors) == 0)
+
+    def get_castling_rights(self):
+        # same bits as the zobrist castling keys: white kingside,
+        # white queenside, black kingside, black queenside
+        rights = 0
+        for bit, (_, y, x, is_white) in enumerate(CASTLING):
+            king = self.chessboard[y][4]
+            rook = self.chessboard[y][x]
+            if isinstance(king, King) and isinstance(rook, Rook) \
+                    and king.is_white == rook.is_white == is_white \
+                    and not king.has_moved and not rook.has_moved:
+                rights |= 1 << bit
+        return rights
+
+    def get_en_passant_key(self):
+        # the file only counts when a pawn is there to take en passant
+        if not self.en_passant:
+            return 0
+
+        if self.white_turn:
+            y = self.en_passant_y + 1
         else:
-            self.pgn += move_number + castle + status
+            y = self.en_passant_y - 1
+
+        for x in (self.en_passant_x - 1, self.en_passant_x + 1):
+            if 0 <= x <= 7:
+                piece = self.chessboard[y][x]
+                if isinstance(piece, Pawn) \
+                        and piece.is_white == self.white_turn:
+                    return EN_PASSANT_KEYS[self.en_passant_x]
+        return 0
+
+    def get_zobrist(self):
+        zobrist = CASTLING_KEYS[self.get_castling_rights()] \
+            ^ self.get_en_passant_key()
+        if not self.white_turn:
+            zobrist ^= BLACK_TURN_KEY
+
+        for y, x in itertools.product(range(8), repeat=2):
+            piece = self.chessboard[y][x]
+            if piece is not None:
+                zobrist ^= PIECE_KEYS[piece.is_white, piece.name][y * 8 + x]
+        return zobrist
+
+    def get_san(self, x, y, nx, ny, promote_to=None):
+        # the move in algebraic notation, without the check mark
+        piece = self.chessboard[y][x]
+        destination = 'abcdefgh'[nx] + '87654321'[ny]
 
-    def undo(self):
-        if len(self.history) > 0:
-            self.chessboard,\
-                self.white_turn,\
-                self.en_passant,\
-                self.en_passant_x,\
-                self.en_passant_y,\
-                self.move_count,\
-                self.is_checked,\
-                self.has_moves,\
-                self.pgn = self.history.pop()
-            self.update_controlled()
+        if isinstance(piece, King) and nx-x == 2:
+            return 'O-O'
+        elif isinstance(piece, King) and nx-x == -2:
+            return 'O-O-O'
 
-    def draw(self):
-        self.result = '1/2-1/2'
-        self.pgn += ' { A draw was agreed. } 1/2-1/2'
+        if isinstance(piece, Pawn):
+            if x != nx:
+                destination = 'abcdefgh'[x] + 'x' + destination
+            if promote_to is not None:
+                destination += '=' + PIECE_LETTERS[promote_to].upper()
+            return destination
 
-    def surrender(self, player):
-        if player:
-            self.result = '0-1'
-            self.pgn += ' { White resigns. } 0-1'
-        else:
-            self.result = '1-0'
-            self.pgn += ' { Black resigns. } 1-0'
+        if self.chessboard[ny][nx] is not None:
+            destination = 'x' + destination
+        return PIECE_LETTERS[piece.name].upper() \
+            + self.get_details(x, y, nx, ny) + destination
 
     def get_details(self, x, y, nx, ny):
-        piece = self.chessboard[y][x]
-        if isinstance(piece, Pawn):
+        # other pieces of the same type that could go to the same square
+        name = self.chessboard[y][x].name
+        others = [(dx, dy) for dx, dy, tx, ty in self.legal_moves
+                  if tx == nx and ty == ny and (dx, dy) != (x, y)
+                  and self.chessboard[dy][dx].name == name]
+        if not others:
+            return ''
+        if all(dx != x for dx, _ in others):
+            return 'abcdefgh'[x]
+        if all(dy != y for _, dy in others):
+            return '87654321'[y]
+        return 'abcdefgh'[x] + '87654321'[y]
+
+    def find_move(self, x, y, nx, ny, promote_to):
+        if (x, y, nx, ny) not in self.legal_moves:
+            return None
+        if not isinstance(self.chessboard[y][x], Pawn) or ny not in (0, 7):
+            promote_to = None
+        elif promote_to not in PROMOTIONS:
+            return None
+        return x, y, nx, ny, promote_to
+
+    def get_check_mark(self, move):
+        # only the pieces and their attacks are moved, pins and moves are
+        # worked out just to tell a check from a checkmate
+        record = self.push(move)
+        if not self.check():
+            self.pop(record)
             return ''
-        for dy, dx in itertools.product(range(8), repeat=2):
-            if self.chessboard[dy][dx] is None:
-                continue
-            temp_piece = self.chessboard[dy][dx]
-            if temp_piece is piece:
-                continue
-            if not isinstance(temp_piece, type(piece)):
-                continue
-            if temp_piece.is_white != piece.is_white:
-                continue
-            if not self.gatekeeper(dx, dy, nx, ny, True):
-                continue
-            if x != dx and y != dy:
-                return 'abcdefgh'[x]
-            if y == dy:
-                return 'abcdefgh'[x]
-            if x == dx:
-                return '87654321'[y]
-        return ''
 
-    def get_attacking(self):
-        attacking = []
-        king_y = king_x = 0
+        is_checked = self.is_checked
+        self.is_checked = True
+        self.update_pins()
+        check_mark = '+' if self.generate_legal_moves() else '#'
+        self.is_checked = is_checked
+        self.pop(record)
+        self.update_pins()
+        return check_mark
+
+    def get_full_moves(self):
+        # every legal move, promotions apart, as the move used here and as
+        # (x, y, nx, ny, promote_to), which are the same on this board
+        for x, y, nx, ny in self.legal_moves:
+            promotions = (None,)
+            if isinstance(self.chessboard[y][x], Pawn) and ny in (0, 7):
+                promotions = PROMOTIONS
+            for promote_to in promotions:
+                yield (x, y, nx, ny, promote_to), (x, y, nx, ny, promote_to)
 
-        for i, j in itertools.product(range(8), repeat=2):
-            piece = self.chessboard[i][j]
-            if piece is not None and isinstance(piece, King) \
-                    and piece.is_white == self.white_turn:
-                king_x = j
-                king_y = i
-                break
-
-        for i, j in itertools.product(range(8), repeat=2):
-            piece = self.chessboard[i][j]
-            if piece is None:
-                continue
-            if piece.is_white != self.white_turn:
-                table = [[False for _ in range(8)] for _ in range(8)]
-                piece.controlled(table, self.chessboard, j, i)
-                if table[king_y][king_x]:
-                    attacking.append((i, j))
-        return attacking
+    def get_attacking(self):
+        king_y, king_x = self.king_squares[self.white_turn]
+        return sorted((i, j) for i, j in self.attackers[king_y][king_x]
+                      if self.chessboard[i][j].is_white != self.white_turn)
 
     def can_castle(self, x, y, nx, ny):
         dx = nx - x
@@ -375,7 +542,9 @@ class Board:
         if rook_x < 0 or rook_x > 7:
             return False
 
-        if self.chessboard[y][rook_x] is None:
+        rook = self.chessboard[y][rook_x]
+        if not isinstance(rook, Rook) \
+                or rook.is_white != self.chessboard[y][x].is_white:
             return False
 
         if self.chessboard[y][rook_x].has_moved \
@@ -396,34 +565,65 @@ class Board:
 
         return True
 
-    def check_block(self, x, y):
-        laser = []
+    def exposes_king(self, x, y, nx, ny):
+        # plays an en passant capture just long enough to see if the
+        # king ends up attacked
         piece = self.chessboard[y][x]
-        if isinstance(piece, (Queen, Rook, Bishop)):
-            laser = piece.check_laser(self.chessboard, x, y, True)
-        return laser
+        captured = self.chessboard[y][nx]
+        changed = [(x, y), (nx, y), (nx, ny)]
 
-    def check_laser(self, x, y, nx, ny):
-        # is there a pin and am I executing correctly
-        for i, j in itertools.product(range(8), repeat=2):
-            piece = self.chessboard[i][j]
-            if piece is None:
-                continue
-            if not isinstance(piece, (Queen, Rook, Bishop)):
-                continue
-            if piece.is_white == self.white_turn:
-                continue
-
-            # is it pinning me?
-            laser = piece.check_laser(self.chessboard, j, i)
-            if len(laser) == 0:
-                continue
-            if (y, x) not in laser:
+        self.chessboard[y][x] = None
+        self.chessboard[y][nx] = None
+        self.chessboard[ny][nx] = piece
+        self.update_attacks(changed)
+        exposed = self.check()
+
+        self.chessboard[ny][nx] = None
+        self.chessboard[y][nx] = captured
+        self.chessboard[y][x] = piece
+        self.update_attacks(changed)
+        return exposed
+
+    def update_pins(self):
+        # the pieces giving check to the side to move, the squares that
+        # take or block a single checker, and the pieces pinned to the king
+        # with the squares they can still move to, found once per position
+        king_y, king_x = self.king_squares[self.white_turn]
+        self.checkers = self.get_attacking()
+        self.check_ray = set()
+        if len(self.checkers) == 1:
+            ty, tx = self.checkers[0]
+            self.check_ray.add((ty, tx))
+            if isinstance(self.chessboard[ty][tx], (Queen, Rook, Bishop)):
+                dy = (ty > king_y) - (ty < king_y)
+                dx = (tx > king_x) - (tx < king_x)
+                i, j = king_y + dy, king_x + dx
+                while (i, j) != (ty, tx):
+                    self.check_ray.add((i, j))
+                    i += dy
+                    j += dx
+
+        self.pins = {}
+        for dy, dx in itertools.product((-1, 0, 1), repeat=2):
+            if (dy, dx) == (0, 0):
                 continue
-
-            # am I moving outside of the laser?
-            return (ny, nx) not in laser
-        return False
+            sliders = (Queen, Bishop) if dy and dx else (Queen, Rook)
+            ray = set()
+            pinned = None
+            i, j = king_y + dy, king_x + dx
+            while 0 <= i <= 7 and 0 <= j <= 7:
+                piece = self.chessboard[i][j]
+                ray.add((i, j))
+                if piece is not None and piece.is_white == self.white_turn:
+                    if pinned is not None:
+                        break
+                    pinned = (i, j)
+                elif piece is not None:
+                    if pinned is not None and isinstance(piece, sliders):
+                        self.pins[pinned] = ray
+                    break
+                i += dy
+                j += dx
 
     def jumps(self, x, y, nx, ny):
         dx = abs(x-nx)
@@ -478,45 +678,84 @@ class Board:
         return False
 
     def update_controlled(self):
-        wtable = [[False for _ in range(8)] for _ in range(8)]
-        btable = [[False for _ in range(8)] for _ in range(8)]
+        # how many pieces of each side control every square, which squares
+        # the piece on (y, x) controls and what controls each square,
+        # built once and then kept up to date by update_attacks
+        self.white_controlled = [[0 for _ in range(8)] for _ in range(8)]
+        self.black_controlled = [[0 for _ in range(8)] for _ in range(8)]
+        self.attacks = {}  # type: Dict[Tuple[int, int], Tuple[bool, List]]
+        self.attackers = [[set() for _ in range(8)]
+                          for _ in range(8)]  # type: List[List[Set]]
 
         for i, j in itertools.product(range(8), repeat=2):
-            piece = self.chessboard[i][j]
-            if piece is None:
-                continue
-            if piece.is_white:
-                piece.controlled(wtable, self.chessboard, j, i)
-            else:
-                piece.controlled(btable, self.chessboard, j, i)
+            if self.chessboard[i][j] is not None:
+                self.add_attacks(j, i)
+
+    def update_attacks(self, squares):
+        # after the pieces on squares changed, only those pieces and the
+        # sliders whose rays reach those squares control something else
+        affected = set()
+        for x, y in squares:
+            affected.add((y, x))
+            for i, j in self.attackers[y][x]:
+                if isinstance(self.chessboard[i][j], (Queen, Rook, Bishop)):
+                    affected.add((i, j))
+
+        for i, j in affected:
+            if (i, j) in self.attacks:
+                self.remove_attacks(j, i)
+        for i, j in affected:
+            if self.chessboard[i][j] is not None:
+                self.add_attacks(j, i)
+
+    def add_attacks(self, x, y):
+        piece = self.chessboard[y][x]
+        if piece.is_white:
+            table = self.white_controlled
+        else:
+            table = self.black_controlled
+
+        squares = piece.get_controlled(self.chessboard, x, y)
+        self.attacks[y, x] = (piece.is_white, squares)
+        for nx, ny in squares:
+            table[ny][nx] += 1
+            self.attackers[ny][nx].add((y, x))
+
+    def remove_attacks(self, x, y):
+        is_white, squares = self.attacks.pop((y, x))
+        if is_white:
+            table = self.white_controlled
+        else:
+            table = self.black_controlled
 
-        self.white_controlled = wtable
-        self.black_controlled = btable
+        for nx, ny in squares:
+            table[ny][nx] -= 1
+            self.attackers[ny][nx].discard((y, x))
 
     def check(self):
-        king_y = king_x = 0
-        for i, j in itertools.product(range(8), repeat=2):
-            piece = self.chessboard[i][j]
-            if piece is not None and isinstance(piece, King) \
-                    and piece.is_white == self.white_turn:
-                king_x = j
-                king_y = i
-                break
+        king_y, king_x = self.king_squares[self.white_turn]
 
         if self.white_turn:
-            return self.black_controlled[king_y][king_x]
+            return self.black_controlled[king_y][king_x] > 0
         else:
-            return self.white_controlled[king_y][king_x]
-
-    def has_legal_move(self):
-        for i, j, k, l in itertools.product(range(8), repeat=4):
-            if self.gatekeeper(j, i, l, k, True, 'queen'):
-                return True
-        return False
+            return self.white_controlled[king_y][king_x] > 0
+
+    def get_candidate_moves(self):
+        # moves that follow each piece's movement pattern, not yet checked
+        # for pins, checks or castling rights
+        for y, x in itertools.product(range(8), repeat=2):
+            piece = self.chessboard[y][x]
+            if piece is None or piece.is_white != self.white_turn:
+                continue
+            for nx, ny in piece.get_moves(self.chessboard, x, y):
+                yield x, y, nx, ny
 
     def get_legal_moves(self):
+        return list(self.legal_moves)
+
+    def generate_legal_moves(self):
         moves = []
-        for i, j, k, l in itertools.product(range(8), repeat=4):
-            if self.gatekeeper(j, i, l, k, True, 'queen'):
-                moves.append((j, i, l, k))
+        for x, y, nx, ny in self.get_candidate_moves():
+            if self.gatekeeper(x, y, nx, ny, True, 'queen'):
+                moves.append((x, y, nx, ny))
         return moves
@@ -1,13 +1,34 @@
-from PIL import Image
-import itertools
-import os
+import difflib
+import re
 from time import strftime
 from .board import Board
+from .fen import PIECE_LETTERS
+from .sprites import get_sprite_name
+
+# anything that looks like a move in san or uci, legal or not
+MOVE_PATTERN = re.compile(r'[KQRBN]?[a-h]?[1-8]?x?[a-h][1-8](=?[QRBN])?'
+                          r'|O-O(-O)?|[a-h][1-8][a-h][1-8][qrbn]?')
+
+
+def get_uci(x, y, nx, ny, promote_to=None):
+    uci = 'abcdefgh'[x] + '87654321'[y] + 'abcdefgh'[nx] + '87654321'[ny]
+    if promote_to is not None:
+        uci += PIECE_LETTERS[promote_to]
+    return uci
+
+
+def get_notation(text):
+    # `Nf3`, `e7e8q` and the old `e7 e8 queen` all end up as one word
+    words = text.split()
+    if len(words) == 3:
+        words[2] = PIECE_LETTERS.get(words[2].lower(), words[2])
+    return ''.join(words).rstrip('+#!?').replace('0', 'O')
 
 
 class Chess:
     def __init__(self, white, black, game_id, guild_id, guild_name, white_user,
-                 black_user, white_elo, black_elo):
+                 black_user, white_elo, black_elo, board_class=Board,
+                 fen=None, channel_id=None):
         self.white = white
         self.black = black
         self.game_id = game_id
@@ -18,94 +39,103 @@ class Chess:
         self.white_elo = white_elo
         self.black_elo = black_elo
         self.date = strftime('%Y.%m.%d')
-        self.board = Board()
-        self.white_turn = True
+        if fen is None:
+            self.board = board_class()
+            self.fen = None
+        else:
+            self.board = board_class.from_fen(fen)
+            self.fen = self.board.to_fen()
+        self.channel_id = channel_id
+        self.white_turn = self.board.white_turn
         self.white_undo = False
         self.black_undo = False
         self.white_draw = False
         self.black_draw = False
-        self.gameover = False
+        self.gameover = self.board.result != '*'
         self.old_x = 0
         self.old_y = 0
         self.new_x = 0
         self.new_y = 0
-
-        # open images
-        self.board_normal_img = Image.open('pictures/board-normal.png')
-        self.board_flipped_img = Image.open('pictures/board-flipped.png')
-
-    def get_images(self):
-        normal_board = 'temp/result-normal.png'
-        flipped_board = 'temp/result-flipped.png'
-        result_normal = Image.new('RGBA', (512, 512), (0, 0, 0, 0))
-        result_flipped = Image.new('RGBA', (512, 512), (0, 0, 0, 0))
-        result_normal.paste(self.board_normal_img, (0, 0))
-        result_flipped.paste(self.board_flipped_img, (0, 0))
-        chessboard = self.board.chessboard
-
-        for y, x in itertools.product(range(8), repeat=2):
-            if chessboard[y][x] is not None:
-                piece_img = chessboard[y][x].img
-                result_normal.paste(
-                    piece_img, (x * 64, y * 64), mask=piece_img)
-                result_flipped.paste(
-                    piece_img, (448 - x * 64, 448 - y * 64), mask=piece_img)
-
-        if not os.path.isdir('temp/'):
-            os.makedirs('temp/')
-
-        result_normal.save(normal_board)
-        result_flipped.save(flipped_board)
-        return normal_board, flipped_board
-
-    def move(self, player_id, mv_from, mv_into, promote_to=None):
+        self.promote_to = None
+        self.notations = None
+
+    def get_position(self):
+        # sprite names from a8 to h1, cheap to copy into a render worker
+        position = []
+        for row in self.board.chessboard:
+            for piece in row:
+                if piece is None:
+                    position.append(None)
+                else:
+                    position.append(get_sprite_name(piece))
+        return tuple(position)
+
+    def get_notations(self):
+        # the legal moves of the position by san and by uci, made once
+        # per position
+        if self.notations is None:
+            self.notations = {}
+            san_moves = self.board.get_san_moves()
+            for san, move in san_moves.items():
+                self.notations[san] = move
+                self.notations[get_uci(*move)] = move
+
+            # san with more than the needed file or rank, and promotions
+            # without the equals sign, are understood too unless they could
+            # be more than one move
+            variants = {}
+            for san, move in san_moves.items():
+                uci = get_uci(*move)
+                if san[0] in 'KQRBN':
+                    take = 'x' if 'x' in san else ''
+                    for origin in (uci[0], uci[1], uci[:2]):
+                        variants.setdefault(san[0] + origin + take + uci[2:4],
+                                            []).append(move)
+                elif '=' in san:
+                    variants[san.replace('=', '')] = [move]
+            for notation, moves in variants.items():
+                if len(moves) == 1:
+                    self.notations.setdefault(notation, moves[0])
+        return self.notations
+
+    def get_suggestions(self, text):
+        # legal moves that are written close to what the player tried
+        return difflib.get_close_matches(get_notation(text),
+                                         self.get_notations(), n=3)
+
+    def move(self, player_id, text):
         if (self.white_turn and player_id != self.white) or \
                 (not self.white_turn and player_id != self.black):
             # not the players turn
             return 1
 
-        elif len(mv_from) != 2 \
-                or len(mv_into) != 2 \
-                or mv_from[0] not in 'abcdefgh' \
-                or mv_from[1] not in '12345678' \
-                or mv_into[0] not in 'abcdefgh' \
-                or mv_into[1] not in '12345678':
+        notation = get_notation(text)
+        move = self.get_notations().get(notation)
+        if move is None and MOVE_PATTERN.fullmatch(notation):
+            # illegal move
+            return 3
+        elif move is None:
             # wrote the move incorrectly
             return 2
 
-        else:
-            self.old_x = 'abcdefgh'.find(mv_from[0])
-            self.old_y = '87654321'.find(mv_from[1])
-            self.new_x = 'abcdefgh'.find(mv_into[0])
-            self.new_y = '87654321'.find(mv_into[1])
-
-            if not self.board.gatekeeper(self.old_x,
-                                         self.old_y,
-                                         self.new_x,
-                                         self.new_y,
-                                         False,
-                                         promote_to):
-                # illegal move
-                return 3
-
-            else:
-                # move executed
-                self.white_undo = False
-                self.black_undo = False
-                self.white_turn = self.board.white_turn
-
-                # checkmate happened
-                if self.board.is_checked and not self.board.has_moves:
-                    self.gameover = True
-
-                # stalemate happened
-                elif not self.board.has_moves:
-                    self.gameover = True
-                return 0
+        self.old_x, self.old_y, self.new_x, self.new_y, self.promote_to = \
+            move
+        self.board.gatekeeper(*move[:4], False, self.promote_to)
+        self.notations = None
+
+        # move executed
+        self.white_undo = False
+        self.black_undo = False
+        self.white_turn = self.board.white_turn
+
+        # checkmate, stalemate or a draw by the rules happened
+        if self.board.result != '*':
+            self.gameover = True
+        return 0
 
     def status(self):
-        # returns the current status of the game (is game over, is stalemate)
-        return self.gameover, self.gameover and not self.board.is_checked
+        # returns the current status of the game (is game over, is draw)
+        return self.gameover, self.gameover and self.board.result == '1/2-1/2'
 
     def surrender(self, player_id):
         if player_id == self.white:
@@ -141,6 +171,7 @@ class Chess:
         if self.white_undo and self.black_undo:
             self.white_undo = self.black_undo = False
             self.board.undo()
+            self.notations = None
             self.white_turn = self.board.white_turn
             return True
         else:
@@ -156,5 +187,10 @@ class Chess:
                f'[Result "{self.board.result}"]\n'\
                f'[WhiteElo "{self.white_elo}"]\n'\
                f'[BlackElo "{self.black_elo}"]\n'\
-               '[Variant "Standard"]\n\n'
-        return tags + self.board.pgn
+               '[Variant "Standard"]\n'
+        if self.fen is not None:
+            # games set up from a position say where they started
+            tags += '[SetUp "1"]\n'\
+                    f'[FEN "{self.fen}"]\n'
+        # the moves are only joined into text when someone asks for it
+        return tags + '\n' + ' '.join(self.board.pgn)
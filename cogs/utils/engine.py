@@ -0,0 +1,273 @@
+from .bitboard import BitBoard, squares, KNIGHT, BISHOP, ROOK, QUEEN
+import copy
+import time
+
+MATE = 100000
+MAX_DEPTH = 64
+EXACT, LOWER, UPPER = range(3)
+PROMOTION_NAMES = {QUEEN: 'queen', ROOK: 'rook', BISHOP: 'bishop',
+                   KNIGHT: 'knight'}
+PIECE_VALUES = (100, 320, 330, 500, 900, 20000)
+
+# piece-square tables from white's point of view, a8 first like the
+# board, black pieces use the mirrored square
+PIECE_SQUARE = (
+    (0, 0, 0, 0, 0, 0, 0, 0,
+     50, 50, 50, 50, 50, 50, 50, 50,
+     10, 10, 20, 30, 30, 20, 10, 10,
+     5, 5, 10, 25, 25, 10, 5, 5,
+     0, 0, 0, 20, 20, 0, 0, 0,
+     5, -5, -10, 0, 0, -10, -5, 5,
+     5, 10, 10, -20, -20, 10, 10, 5,
+     0, 0, 0, 0, 0, 0, 0, 0),
+    (-50, -40, -30, -30, -30, -30, -40, -50,
+     -40, -20, 0, 0, 0, 0, -20, -40,
+     -30, 0, 10, 15, 15, 10, 0, -30,
+     -30, 5, 15, 20, 20, 15, 5, -30,
+     -30, 0, 15, 20, 20, 15, 0, -30,
+     -30, 5, 10, 15, 15, 10, 5, -30,
+     -40, -20, 0, 5, 5, 0, -20, -40,
+     -50, -40, -30, -30, -30, -30, -40, -50),
+    (-20, -10, -10, -10, -10, -10, -10, -20,
+     -10, 0, 0, 0, 0, 0, 0, -10,
+     -10, 0, 5, 10, 10, 5, 0, -10,
+     -10, 5, 5, 10, 10, 5, 5, -10,
+     -10, 0, 10, 10, 10, 10, 0, -10,
+     -10, 10, 10, 10, 10, 10, 10, -10,
+     -10, 5, 0, 0, 0, 0, 5, -10,
+     -20, -10, -10, -10, -10, -10, -10, -20),
+    (0, 0, 0, 0, 0, 0, 0, 0,
+     5, 10, 10, 10, 10, 10, 10, 5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     -5, 0, 0, 0, 0, 0, 0, -5,
+     0, 0, 0, 5, 5, 0, 0, 0),
+    (-20, -10, -10, -5, -5, -10, -10, -20,
+     -10, 0, 0, 0, 0, 0, 0, -10,
+     -10, 0, 5, 5, 5, 5, 0, -10,
+     -5, 0, 5, 5, 5, 5, 0, -5,
+     0, 0, 5, 5, 5, 5, 0, -5,
+     -10, 5, 5, 5, 5, 5, 0, -10,
+     -10, 0, 5, 0, 0, 0, 0, -10,
+     -20, -10, -10, -5, -5, -10, -10, -20),
+    (-30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -30, -40, -40, -50, -50, -40, -40, -30,
+     -20, -30, -30, -40, -40, -30, -30, -20,
+     -10, -20, -20, -20, -20, -20, -20, -10,
+     20, 20, 0, 0, 0, 0, 20, 20,
+     20, 30, 10, 0, 0, 10, 30, 20)
+)
+
+# value of each piece type on each square, for both colors
+SQUARE_VALUES = {
+    True: [[PIECE_VALUES[t] + PIECE_SQUARE[t][square] for square in range(64)]
+           for t in range(6)],
+    False: [[PIECE_VALUES[t] + PIECE_SQUARE[t][square ^ 56]
+             for square in range(64)] for t in range(6)]
+}
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Search:
+    def __init__(self, board, time_limit, node_limit=None):
+        self.board = board
+        self.deadline = time.monotonic() + time_limit
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.table = {}
+        self.killers = [None] * (MAX_DEPTH * 2)
+        self.best_move = None
+
+        # positions already seen in the game or on the current line,
+        # going back to any of them is scored as a draw
+        self.seen = set(board.positions)
+
+    def tick(self):
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchTimeout
+        if self.nodes & 1023 == 0 and time.monotonic() > self.deadline:
+            raise SearchTimeout
+
+    def evaluate(self):
+        # material and piece placement, from the side to move's view
+        score = 0
+        for is_white, sign in ((True, 1), (False, -1)):
+            for piece_type, bitboard in enumerate(
+                    self.board.pieces[is_white]):
+                values = SQUARE_VALUES[is_white][piece_type]
+                for square in squares(bitboard):
+                    score += sign * values[square]
+        return score if self.board.white_turn else -score
+
+    def order(self, moves, table_move, ply):
+        board = self.board
+
+        def priority(move):
+            if move == table_move:
+                return 1000000
+            origin, target, promotion = move
+            victim = board.squares[target]
+            if victim is not None:
+                # most valuable victim, least valuable attacker
+                return 100000 + PIECE_VALUES[victim[1]] * 10 \
+                    - PIECE_VALUES[board.squares[origin][1]] // 10
+            if promotion is not None:
+                return 90000 + PIECE_VALUES[promotion]
+            if move == self.killers[ply]:
+                return 80000
+            return 0
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def quiesce(self, alpha, beta, ply):
+        self.tick()
+        board = self.board
+        stand_pat = self.evaluate()
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+
+        us = board.white_turn
+        captures = [move for move in board.generate_pseudo_moves()
+                    if board.squares[move[1]] is not None
+                    or move[2] is not None]
+        for move in self.order(captures, None, ply):
+            record = board.push(move)
+            if board.attacked(board.king_square(us), not us):
+                board.pop(record)
+                continue
+            score = -self.quiesce(-beta, -alpha, ply + 1)
+            board.pop(record)
+
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def negamax(self, depth, alpha, beta, ply):
+        board = self.board
+        in_check = board.check()
+        if in_check and ply < MAX_DEPTH:
+            depth += 1
+        if depth <= 0 or ply >= MAX_DEPTH:
+            return self.quiesce(alpha, beta, ply)
+        self.tick()
+
+        original_alpha = alpha
+        table_move = None
+        entry = self.table.get(board.zobrist)
+        if entry is not None:
+            entry_depth, score, flag, table_move = entry
+            if entry_depth >= depth and ply > 0:
+                # mate scores are stored relative to this node
+                if score > MATE - MAX_DEPTH * 2:
+                    score -= ply
+                elif score < -MATE + MAX_DEPTH * 2:
+                    score += ply
+
+                if flag == EXACT:
+                    return score
+                elif flag == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        us = board.white_turn
+        best_score = -MATE
+        best_move = None
+        legal_moves = 0
+        for move in self.order(board.generate_pseudo_moves(),
+                               table_move, ply):
+            record = board.push(move)
+            if board.attacked(board.king_square(us), not us):
+                board.pop(record)
+                continue
+
+            legal_moves += 1
+            if board.zobrist in self.seen:
+                score = 0
+            else:
+                self.seen.add(board.zobrist)
+                score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+                self.seen.discard(board.zobrist)
+            board.pop(record)
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if ply == 0:
+                    self.best_move = move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                if board.squares[move[1]] is None:
+                    self.killers[ply] = move
+                break
+
+        if legal_moves == 0:
+            return -MATE + ply if in_check else 0
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+
+        stored_score = best_score
+        if stored_score > MATE - MAX_DEPTH * 2:
+            stored_score += ply
+        elif stored_score < -MATE + MAX_DEPTH * 2:
+            stored_score -= ply
+        self.table[board.zobrist] = (depth, stored_score, flag, best_move)
+        return best_score
+
+    def run(self):
+        moves = self.board.legal_moves
+        if len(moves) == 0:
+            return None
+        if len(moves) == 1:
+            return moves[0]
+
+        # iterative deepening, each iteration starts with the last best move
+        best_move = self.order(moves, None, 0)[0]
+        try:
+            for depth in range(1, MAX_DEPTH):
+                self.best_move = None
+                score = self.negamax(depth, -MATE, MATE, 0)
+                best_move = self.best_move
+                if abs(score) > MATE - MAX_DEPTH * 2:
+                    break
+        except SearchTimeout:
+            # a move that beat the previous best was fully searched
+            if self.best_move is not None:
+                best_move = self.best_move
+        return best_move
+
+
+def get_search_board(board):
+    # the search works on its own copy, never on the game's board
+    if isinstance(board, BitBoard):
+        return copy.deepcopy(board)
+    else:
+        return BitBoard.from_board(board)
+
+
+def best_move(board, time_limit=2.0, node_limit=None):
+    # returns (x, y, nx, ny, promote_to) like gatekeeper takes them
+    move = Search(board, time_limit, node_limit).run()
+    if move is None:
+        return None
+
+    origin, target, promotion = move
+    return origin % 8, origin // 8, target % 8, target // 8, \
+        PROMOTION_NAMES.get(promotion)
@@ -0,0 +1,122 @@
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+PIECE_NAMES = {'p': 'pawn', 'n': 'knight', 'b': 'bishop', 'r': 'rook',
+               'q': 'queen', 'k': 'king'}
+PIECE_LETTERS = {name: letter for letter, name in PIECE_NAMES.items()}
+
+# castling rights use the zobrist bits: white kingside, white queenside,
+# black kingside and black queenside, with the squares the king and the
+# rook must be on as (y, x)
+CASTLING = (('K', 7, 7, True), ('Q', 7, 0, True),
+            ('k', 0, 7, False), ('q', 0, 0, False))
+
+
+def parse_fen(fen):
+    # returns (rows, white_turn, castling, en_passant, halfmove_clock,
+    # fullmove), rows has (is_white, piece name) or None for every square
+    # and en_passant is a square number or None, raises ValueError
+    fields = fen.split()
+    if len(fields) == 4:
+        fields += ['0', '1']
+    if len(fields) != 6:
+        raise ValueError('a FEN has six fields separated by spaces')
+    placement, turn, castling_field, en_passant_field, halfmove, fullmove = \
+        fields
+
+    rows = []
+    for row in placement.split('/'):
+        squares = []
+        for char in row:
+            if char in '12345678':
+                squares.extend([None] * int(char))
+            elif char.lower() in PIECE_NAMES:
+                squares.append((char.isupper(), PIECE_NAMES[char.lower()]))
+            else:
+                raise ValueError(f'`{char}` is not a piece')
+        if len(squares) != 8:
+            raise ValueError('every rank needs 8 squares')
+        rows.append(squares)
+    if len(rows) != 8:
+        raise ValueError('the board needs 8 ranks')
+
+    pieces = [square for row in rows for square in row]
+    if pieces.count((True, 'king')) != 1 or pieces.count((False, 'king')) != 1:
+        raise ValueError('each side needs exactly one king')
+    if any(square is not None and square[1] == 'pawn'
+           for square in rows[0] + rows[7]):
+        raise ValueError('pawns can\'t be on the first or last rank')
+
+    if turn not in ('w', 'b'):
+        raise ValueError('the side to move has to be `w` or `b`')
+    white_turn = turn == 'w'
+
+    castling = 0
+    if castling_field != '-':
+        for char in castling_field:
+            for bit, (letter, y, x, is_white) in enumerate(CASTLING):
+                if char == letter:
+                    break
+            else:
+                raise ValueError(f'`{char}` is not a castling right')
+            if rows[y][4] != (is_white, 'king') \
+                    or rows[y][x] != (is_white, 'rook'):
+                raise ValueError(f'castling right `{char}` needs the king '
+                                 'and rook on their squares')
+            castling |= 1 << bit
+
+    en_passant = None
+    if en_passant_field != '-':
+        # the square behind a pawn that was just pushed two squares
+        y = 2 if white_turn else 5
+        pawn_y = 3 if white_turn else 4
+        if len(en_passant_field) != 2 \
+                or en_passant_field[0] not in 'abcdefgh' \
+                or en_passant_field[1] != '87654321'[y]:
+            raise ValueError(f'`{en_passant_field}` can\'t be an en passant '
+                             'square')
+        x = 'abcdefgh'.index(en_passant_field[0])
+        if rows[pawn_y][x] != (not white_turn, 'pawn') \
+                or rows[y][x] is not None:
+            raise ValueError(f'`{en_passant_field}` can\'t be an en passant '
+                             'square')
+        en_passant = y * 8 + x
+
+    if not halfmove.isdigit() or not fullmove.isdigit() or int(fullmove) < 1:
+        raise ValueError('the move counters have to be positive numbers')
+
+    return rows, white_turn, castling, en_passant, int(halfmove), \
+        int(fullmove)
+
+
+def format_fen(rows, white_turn, castling, en_passant, halfmove_clock,
+               fullmove):
+    # the reverse of parse_fen
+    placement = []
+    for row in rows:
+        text = ''
+        empty = 0
+        for square in row:
+            if square is None:
+                empty += 1
+                continue
+            if empty:
+                text += str(empty)
+                empty = 0
+            is_white, name = square
+            letter = PIECE_LETTERS[name]
+            text += letter.upper() if is_white else letter
+        if empty:
+            text += str(empty)
+        placement.append(text)
+
+    castling_field = ''.join(letter for bit, (letter, _, _, _)
+                             in enumerate(CASTLING) if castling >> bit & 1)
+    if en_passant is None:
+        en_passant_field = '-'
+    else:
+        en_passant_field = 'abcdefgh'[en_passant % 8] \
+            + '87654321'[en_passant // 8]
+
+    return f'{"/".join(placement)} {"w" if white_turn else "b"} ' \
+           f'{castling_field or "-"} {en_passant_field} ' \
+           f'{halfmove_clock} {fullmove}'
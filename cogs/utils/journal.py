@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import sqlite3
+import sys
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS games ('
+    'game_id INTEGER PRIMARY KEY, guild_id INTEGER, guild_name TEXT, '
+    'white INTEGER, black INTEGER, white_user TEXT, black_user TEXT, '
+    'white_elo INTEGER, black_elo INTEGER, date TEXT, fen TEXT, '
+    'channel_id INTEGER)',
+    'CREATE TABLE IF NOT EXISTS moves ('
+    'game_id INTEGER, ply INTEGER, move TEXT, promotion TEXT, '
+    'PRIMARY KEY (game_id, ply))',
+    'CREATE TABLE IF NOT EXISTS counters ('
+    'name TEXT PRIMARY KEY, value INTEGER)',
+    'CREATE TABLE IF NOT EXISTS engine_times ('
+    'guild_id INTEGER PRIMARY KEY, seconds REAL)'
+)
+
+
+class GameJournal:
+    def __init__(self, path='games.db', delay=1.0):
+        # writes wait up to delay seconds and then go to the database
+        # together, on a thread of their own
+        self.path = path
+        self.delay = delay
+        self.pending = []
+        self.flush_handle = None
+        self.executor = ThreadPoolExecutor(1)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+        self.connection.commit()
+
+    def load(self):
+        # returns the last game id given and every unfinished game with
+        # its moves, oldest first
+        cursor = self.connection.execute(
+            'SELECT value FROM counters WHERE name = ?', ('last_game_id',))
+        row = cursor.fetchone()
+        last_game_id = row[0] if row is not None else 0
+
+        games = []
+        for game in self.connection.execute(
+                'SELECT * FROM games ORDER BY game_id'):
+            moves = self.connection.execute(
+                'SELECT move, promotion FROM moves WHERE game_id = ? '
+                'ORDER BY ply', (game[0],)).fetchall()
+            games.append((game, moves))
+            last_game_id = max(last_game_id, game[0])
+        return last_game_id, games
+
+    def load_engine_times(self):
+        # seconds the bot thinks per move in guilds that changed it
+        return dict(self.connection.execute(
+            'SELECT guild_id, seconds FROM engine_times'))
+
+    def set_engine_time(self, guild_id, seconds):
+        self.write('INSERT OR REPLACE INTO engine_times VALUES (?, ?)',
+                   (guild_id, seconds))
+
+    def add_game(self, match):
+        self.write('INSERT OR REPLACE INTO games '
+                   'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                   (match.game_id, match.guild_id, match.guild_name,
+                    match.white, match.black, match.white_user,
+                    match.black_user, match.white_elo, match.black_elo,
+                    match.date, match.fen, match.channel_id))
+        self.write('INSERT OR REPLACE INTO counters VALUES (?, ?)',
+                   ('last_game_id', match.game_id))
+
+    def add_move(self, game_id, ply, move, promotion):
+        self.write('INSERT OR REPLACE INTO moves VALUES (?, ?, ?, ?)',
+                   (game_id, ply, move, promotion))
+
+    def remove_move(self, game_id, ply):
+        self.write('DELETE FROM moves WHERE game_id = ? AND ply = ?',
+                   (game_id, ply))
+
+    def end_game(self, game_id):
+        self.write('DELETE FROM moves WHERE game_id = ?', (game_id,))
+        self.write('DELETE FROM games WHERE game_id = ?', (game_id,))
+
+    def write(self, statement, parameters):
+        self.pending.append((statement, parameters))
+        if self.flush_handle is None:
+            loop = asyncio.get_event_loop()
+            self.flush_handle = loop.call_later(self.delay, self.flush)
+
+    def flush(self):
+        self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if batch:
+            self.executor.submit(self.commit, batch)
+
+    def commit(self, batch):
+        # one transaction for the whole batch
+        try:
+            with self.connection:
+                for statement, parameters in batch:
+                    self.connection.execute(statement, parameters)
+        except sqlite3.Error as exc:
+            print(f'Could not save {len(batch)} game changes: {exc}',
+                  file=sys.stderr)
+
+    def close(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+        self.flush()
+        self.executor.shutdown(wait=True)
+        self.connection.close()
@@ -1,22 +1,16 @@
 from .piece import Piece
-from PIL import Image
 import itertools
 
 
 class King(Piece):
+    name = 'king'
+
     def __init__(self, is_white, has_moved=False):
         super(King, self).__init__(is_white, has_moved)
-        if self.is_white:
-            self.img = Image.open('pictures/king-w.png')
-        else:
-            self.img = Image.open('pictures/king-b.png')
 
     def __deepcopy__(self, memodict):
         return King(self.is_white, self.has_moved)
 
-    def check_laser(self, chessboard, x, y, check_mode):
-        return []
-
     def can_move(self, x, y, new_x, new_y, piece_in_path):
         dx = abs(x-new_x)
         dy = abs(y-new_y)
@@ -24,7 +18,30 @@ class King(Piece):
             or (dx == 0 and dy == 1) \
             or (dx == 1 and dy == 0)
 
-    def controlled(self, table, chessboard, x, y):
-        for i, j in itertools.product(range(8), repeat=2):
-            if self.can_move(x, y, j, i, False):
-                table[i][j] = True
+    def get_controlled(self, chessboard, x, y):
+        squares = []
+        for dx, dy in itertools.product((-1, 0, 1), repeat=2):
+            nx = x + dx
+            ny = y + dy
+            if (dx, dy) != (0, 0) and 0 <= nx <= 7 and 0 <= ny <= 7:
+                squares.append((nx, ny))
+        return squares
+
+    def get_moves(self, chessboard, x, y):
+        moves = []
+        for dx, dy in itertools.product((-1, 0, 1), repeat=2):
+            nx = x + dx
+            ny = y + dy
+            if (dx, dy) == (0, 0) or not (0 <= nx <= 7 and 0 <= ny <= 7):
+                continue
+            piece = chessboard[ny][nx]
+            if piece is None or piece.is_white != self.is_white:
+                moves.append((nx, ny))
+
+        # castling, the board decides if it's actually possible
+        if not self.has_moved:
+            if x > 1:
+                moves.append((x-2, y))
+            if x < 6:
+                moves.append((x+2, y))
+        return moves
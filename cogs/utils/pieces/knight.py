@@ -1,28 +1,38 @@
 from .piece import Piece
-from PIL import Image
 import itertools
 
 
 class Knight(Piece):
+    name = 'knight'
+
     def __init__(self, is_white, has_moved=False):
         super(Knight, self).__init__(is_white, has_moved)
-        if self.is_white:
-            self.img = Image.open('pictures/knight-w.png')
-        else:
-            self.img = Image.open('pictures/knight-b.png')
 
     def __deepcopy__(self, memodict):
         return Knight(self.is_white, self.has_moved)
 
-    def check_laser(self, chessboard, x, y, check_mode):
-        return []
-
     def can_move(self, x, y, new_x, new_y, piece_in_path):
         dx = abs(x-new_x)
         dy = abs(y-new_y)
         return (dx == 2 and dy == 1) or (dx == 1 and dy == 2)
 
-    def controlled(self, table, chessboard, x, y):
-        for i, j in itertools.product(range(8), repeat=2):
-            if self.can_move(x, y, j, i, False):
-                table[i][j] = True
+    def get_controlled(self, chessboard, x, y):
+        squares = []
+        for dx, dy in itertools.permutations((-2, -1, 1, 2), 2):
+            nx = x + dx
+            ny = y + dy
+            if abs(dx) != abs(dy) and 0 <= nx <= 7 and 0 <= ny <= 7:
+                squares.append((nx, ny))
+        return squares
+
+    def get_moves(self, chessboard, x, y):
+        moves = []
+        for dx, dy in itertools.permutations((-2, -1, 1, 2), 2):
+            nx = x + dx
+            ny = y + dy
+            if abs(dx) == abs(dy) or not (0 <= nx <= 7 and 0 <= ny <= 7):
+                continue
+            piece = chessboard[ny][nx]
+            if piece is None or piece.is_white != self.is_white:
+                moves.append((nx, ny))
+        return moves
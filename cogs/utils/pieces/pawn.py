@@ -1,21 +1,15 @@
 from .piece import Piece
-from PIL import Image
 
 
 class Pawn(Piece):
+    name = 'pawn'
+
     def __init__(self, is_white, has_moved=False):
         super(Pawn, self).__init__(is_white, has_moved)
-        if self.is_white:
-            self.img = Image.open('pictures/pawn-w.png')
-        else:
-            self.img = Image.open('pictures/pawn-b.png')
 
     def __deepcopy__(self, memodict):
         return Pawn(self.is_white, self.has_moved)
 
-    def check_laser(self, chessboard, x, y, check_mode):
-        return []
-
     def can_move(self, x, y, new_x, new_y, piece_in_path):
         dx = abs(x-new_x)
         dy = y-new_y
@@ -32,16 +26,42 @@ class Pawn(Piece):
 
         return False
 
-    def controlled(self, table, chessboard, x, y):
+    def get_controlled(self, chessboard, x, y):
         if (self.is_white and y == 0) or (not self.is_white and y == 7):
-            return table
+            return []
 
         if self.is_white:
             dy = y-1
         else:
             dy = y+1
 
+        squares = []
         if x < 7:
-            table[dy][x+1] = True
+            squares.append((x+1, dy))
         if x > 0:
-            table[dy][x-1] = True
+            squares.append((x-1, dy))
+        return squares
+
+    def get_moves(self, chessboard, x, y):
+        if (self.is_white and y == 0) or (not self.is_white and y == 7):
+            return []
+
+        if self.is_white:
+            dy = -1
+        else:
+            dy = 1
+
+        moves = []
+        if chessboard[y+dy][x] is None:
+            moves.append((x, y+dy))
+            if not self.has_moved and 0 <= y+2*dy <= 7 \
+                    and chessboard[y+2*dy][x] is None:
+                moves.append((x, y+2*dy))
+
+        # captures, including en passant which lands on an empty square
+        for dx in (-1, 1):
+            if 0 <= x+dx <= 7:
+                piece = chessboard[y+dy][x+dx]
+                if piece is None or piece.is_white != self.is_white:
+                    moves.append((x+dx, y+dy))
+        return moves
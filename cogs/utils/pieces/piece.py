@@ -2,18 +2,18 @@ from abc import ABC, abstractmethod
 
 
 class Piece(ABC):
+    name = None
+
     def __init__(self, is_white, has_moved):
         self.is_white = is_white
         self.has_moved = has_moved
-        self.img = None
         self.diagonal = (-1, -1, 1, 1, -1)
         self.straight = (-1, 0, 1, 0, -1)
 
-    def get_laser(self, movements, chessboard, x, y, check_mode):
+    def get_ray_controlled(self, movements, chessboard, x, y):
         from .king import King
+        squares = []
         for i in range(4):
-            piece_count = 0
-            laser = [(y, x)]
             sum_x = movements[i]
             sum_y = movements[i+1]
             count_x = x + sum_x
@@ -21,48 +21,44 @@ class Piece(ABC):
 
             while 0 <= count_x <= 7 and 0 <= count_y <= 7:
                 piece = chessboard[count_y][count_x]
-                if piece is not None:
-                    if piece.is_white == self.is_white:
-                        break
-                    elif check_mode and isinstance(piece, King) \
-                            and piece_count == 0:
-                        return laser
-                    elif check_mode:
-                        break
-                    elif isinstance(piece, King) and piece_count == 1:
-                        return laser
-                    else:
-                        piece_count += 1
-                laser.append((count_y, count_x))
+                squares.append((count_x, count_y))
+                # the enemy king can't hide behind itself, so rays go
+                # through it, any other piece stops them
+                if piece is not None \
+                        and not (isinstance(piece, King)
+                                 and piece.is_white != self.is_white):
+                    break
                 count_x += sum_x
                 count_y += sum_y
-        return []
+        return squares
 
-    @staticmethod
-    def possible_moves(movements, table, chessboard, x, y):
-        from .king import King
+    def get_ray_moves(self, movements, chessboard, x, y):
+        moves = []
         for i in range(4):
-            exit_loop = False
             sum_x = movements[i]
             sum_y = movements[i+1]
             count_x = x + sum_x
             count_y = y + sum_y
 
-            while 0 <= count_x <= 7 and 0 <= count_y <= 7 and not exit_loop:
+            while 0 <= count_x <= 7 and 0 <= count_y <= 7:
                 piece = chessboard[count_y][count_x]
-                exit_loop = piece is not None and not isinstance(piece, King)
-                table[count_y][count_x] = True
+                if piece is not None and piece.is_white == self.is_white:
+                    break
+                moves.append((count_x, count_y))
+                if piece is not None:
+                    break
                 count_x += sum_x
                 count_y += sum_y
+        return moves
 
     @abstractmethod
-    def check_laser(self, chessboard, x, y, check_mode):
+    def can_move(self, x, y, new_x, new_y, piece_in_path):
         pass
 
     @abstractmethod
-    def can_move(self, x, y, new_x, new_y, piece_in_path):
+    def get_controlled(self, chessboard, x, y):
         pass
 
     @abstractmethod
-    def controlled(self, table, chessboard, x, y):
+    def get_moves(self, chessboard, x, y):
         pass
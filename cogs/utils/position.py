@@ -0,0 +1,142 @@
+from abc import ABC, abstractmethod
+
+
+class Position(ABC):
+    # what Board and BitBoard share: move numbers, repetitions, draws,
+    # results and the pgn, the engines only tell how the pieces move
+    def __init__(self):
+        # game settings
+        self.pgn = []  # every move with its number, check mark and comments
+        self.result = '*'
+        self.move_count = 0
+        self.halfmove_clock = 0
+        self.history = []
+        self.is_checked = False
+        self.has_moves = True
+        self.white_turn = True
+
+    def count_move(self, white_moved):
+        # the number written before the move, if it needs one
+        if white_moved:
+            self.move_count += 1
+            return f'{self.move_count}. '
+        if not self.pgn:
+            # the game was set up with black to move
+            return f'{self.move_count}... '
+        return ''
+
+    def add_position(self):
+        self.positions[self.zobrist] = self.positions.get(self.zobrist, 0) + 1
+
+    def forget_move(self):
+        # takes the last move out of the repetitions and the pgn, before
+        # the position goes back
+        if self.positions[self.zobrist] > 1:
+            self.positions[self.zobrist] -= 1
+        else:
+            self.positions.pop(self.zobrist)
+        self.pgn.pop()
+
+    def finish_move(self, san, material_changed):
+        # adds the move to the pgn and ends the game if it's over,
+        # is_checked and has_moves have to be up to date
+        status = ''
+        if self.is_checked and not self.has_moves:
+            if self.white_turn:
+                status = '# { Black wins by checkmate. } 0-1'
+                self.result = '0-1'
+            else:
+                status = '# { White wins by checkmate. } 1-0'
+                self.result = '1-0'
+
+        elif self.is_checked:
+            status = '+'
+        elif not self.is_checked and not self.has_moves:
+            self.result = '1/2-1/2'
+            status = ' { Draw by stalemate. } 1/2-1/2'
+
+        if self.result == '*':
+            reason = self.get_draw_reason(material_changed)
+            if reason is not None:
+                self.result = '1/2-1/2'
+                status += f' {{ Draw by {reason}. }} 1/2-1/2'
+
+        self.pgn.append(san + status)
+
+    def adjudicate(self):
+        # a position can be over before anyone moves
+        if self.is_checked and not self.has_moves:
+            self.result = '0-1' if self.white_turn else '1-0'
+        elif not self.has_moves or self.get_draw_reason(True) is not None:
+            self.result = '1/2-1/2'
+
+    def get_draw_reason(self, material_changed):
+        if self.positions[self.zobrist] >= 3:
+            return 'threefold repetition'
+        if self.halfmove_clock >= 100:
+            return 'the fifty-move rule'
+        # material only changes with captures and promotions
+        if material_changed and self.insufficient_material():
+            return 'insufficient material'
+        return None
+
+    def draw(self):
+        self.result = '1/2-1/2'
+        self.pgn.append('{ A draw was agreed. } 1/2-1/2')
+
+    def surrender(self, player):
+        if player:
+            self.result = '0-1'
+            self.pgn.append('{ White resigns. } 0-1')
+        else:
+            self.result = '1-0'
+            self.pgn.append('{ Black resigns. } 1-0')
+
+    def has_legal_move(self):
+        return len(self.legal_moves) > 0
+
+    def move_to_san(self, x, y, nx, ny, promote_to=None):
+        # a legal move in algebraic notation, with its check mark, raises
+        # ValueError for anything else
+        move = self.find_move(x, y, nx, ny, promote_to)
+        if move is None:
+            raise ValueError(f'({x}, {y}) to ({nx}, {ny}) is not a legal move')
+        return self.get_san(*move) + self.get_check_mark(move)
+
+    def san_to_move(self, san):
+        # (x, y, nx, ny, promote_to) of the legal move written in san,
+        # raises ValueError if there's none
+        move = self.get_san_moves().get(san.rstrip('+#!?').replace('0', 'O'))
+        if move is None:
+            raise ValueError(f'`{san}` is not a legal move')
+        return move
+
+    def get_san_moves(self):
+        # every legal move by its algebraic notation without check marks,
+        # as (x, y, nx, ny, promote_to)
+        return {self.get_san(*move): coordinates
+                for move, coordinates in self.get_full_moves()}
+
+    @abstractmethod
+    def find_move(self, x, y, nx, ny, promote_to):
+        pass
+
+    @abstractmethod
+    def get_san(self, *move):
+        pass
+
+    @abstractmethod
+    def get_check_mark(self, move):
+        pass
+
+    @abstractmethod
+    def get_full_moves(self):
+        pass
+
+    @abstractmethod
+    def insufficient_material(self):
+        pass
+
+    @abstractmethod
+    def generate_legal_moves(self):
+        pass
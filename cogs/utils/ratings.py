@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+import asyncio
+import bisect
+import json
+import os
+import sys
+import time
+
+
+class RatingStore:
+    def __init__(self, directory='ranks', delay=5.0, idle=600.0,
+                 legacy_path='ranks.json'):
+        # ratings are kept in one file per guild, a guild is only read when
+        # it's needed and forgotten after idle seconds without use, changes
+        # are saved a while after they happen so games that end close
+        # together share one write
+        self.directory = directory
+        self.delay = delay
+        self.idle = idle
+        self.ranks = {}  # type: Dict[int, Dict[int, float]]
+        self.leaderboards = {}  # type: Dict[int, List[Tuple[float, int]]]
+        self.last_used = {}  # type: Dict[int, float]
+        self.last_sweep = time.monotonic()
+        self.dirty = set()
+        self.flush_handle = None
+        self.executor = ThreadPoolExecutor(1)
+
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(legacy_path):
+            self.split_legacy(legacy_path)
+
+    def split_legacy(self, legacy_path):
+        # ranks.json had every guild in it, each one gets its own file
+        with open(legacy_path, 'r') as ranks_file:
+            raw_dict = json.loads(ranks_file.read())
+        for guild_id, guild_ranks in raw_dict.items():
+            self.write(int(guild_id), json.dumps(guild_ranks))
+        os.replace(legacy_path, legacy_path + '.old')
+
+    def get_path(self, guild_id):
+        return os.path.join(self.directory, f'{guild_id}.json')
+
+    def get(self, guild_id):
+        now = time.monotonic()
+        if now - self.last_sweep > self.idle:
+            self.evict(now)
+        self.last_used[guild_id] = now
+
+        if guild_id not in self.ranks:
+            try:
+                with open(self.get_path(guild_id), 'r') as ranks_file:
+                    self.ranks[guild_id] = {
+                        int(i): e
+                        for i, e in json.loads(ranks_file.read()).items()
+                    }
+            except FileNotFoundError:
+                self.ranks[guild_id] = {}
+
+            # (-rating, user id) pairs, best player first
+            self.leaderboards[guild_id] = sorted(
+                (-rating, user_id)
+                for user_id, rating in self.ranks[guild_id].items())
+        return self.ranks[guild_id]
+
+    def set(self, guild_id, user_id, rating):
+        # ratings only change through here so the leaderboard stays sorted
+        guild_ranks = self.get(guild_id)
+        leaderboard = self.leaderboards[guild_id]
+        if user_id in guild_ranks:
+            index = bisect.bisect_left(leaderboard,
+                                       (-guild_ranks[user_id], user_id))
+            del leaderboard[index]
+        guild_ranks[user_id] = rating
+        bisect.insort(leaderboard, (-rating, user_id))
+        self.save(guild_id)
+
+    def get_page(self, guild_id, start, count):
+        # (user id, rating) of the players ranked from start on, and how
+        # many players the guild has
+        self.get(guild_id)
+        leaderboard = self.leaderboards[guild_id]
+        return [(user_id, -rating)
+                for rating, user_id in leaderboard[start:start + count]], \
+            len(leaderboard)
+
+    def evict(self, now):
+        # unsaved guilds stay until they're written
+        self.last_sweep = now
+        for guild_id, last_used in list(self.last_used.items()):
+            if now - last_used > self.idle and guild_id not in self.dirty:
+                self.ranks.pop(guild_id, None)
+                self.leaderboards.pop(guild_id, None)
+                self.last_used.pop(guild_id)
+
+    def save(self, guild_id):
+        self.last_used[guild_id] = time.monotonic()
+        self.dirty.add(guild_id)
+        if self.flush_handle is None:
+            loop = asyncio.get_event_loop()
+            self.flush_handle = loop.call_later(self.delay, self.flush)
+
+    def flush(self):
+        self.flush_handle = None
+        for guild_id in self.dirty:
+            self.executor.submit(self.write, guild_id,
+                                 json.dumps(self.ranks[guild_id]))
+        self.dirty.clear()
+
+    def write(self, guild_id, text):
+        # a crash halfway through leaves the old file in place
+        path = self.get_path(guild_id)
+        temp_path = path + '.tmp'
+        try:
+            with open(temp_path, 'w') as file:
+                file.write(text)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, path)
+            print(f'Ranks saved to \'{path}\'!')
+            print('__________________')
+        except OSError as exc:
+            print(f'Could not save the ranks of guild {guild_id}: {exc}',
+                  file=sys.stderr)
+
+    def close(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+        self.flush()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,99 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from PIL import Image
+import asyncio
+import collections
+import io
+from .sprites import SPRITES
+
+
+def get_location(square, flipped):
+    y, x = divmod(square, 8)
+    if flipped:
+        return 448 - x * 64, 448 - y * 64
+    else:
+        return x * 64, y * 64
+
+
+def get_background(flipped):
+    if flipped:
+        return SPRITES['board-flipped']
+    else:
+        return SPRITES['board-normal']
+
+
+def draw_position(position, flipped=False):
+    # position is a tuple of 64 sprite names (or None), from a8 to h1
+    result = Image.new('RGBA', (512, 512), (0, 0, 0, 0))
+    result.paste(get_background(flipped), (0, 0))
+
+    for square, name in enumerate(position):
+        if name is not None:
+            piece_img = SPRITES[name]
+            result.paste(piece_img, get_location(square, flipped),
+                         mask=piece_img)
+    return result
+
+
+def encode(image):
+    data = io.BytesIO()
+    image.save(data, 'png')
+    return data.getvalue()
+
+
+def render_position(position, flipped=False):
+    return encode(draw_position(position, flipped))
+
+
+class RenderCache:
+    """Least recently used PNGs, keyed by position and orientation."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.images = collections.OrderedDict()
+
+    def get(self, key):
+        data = self.images.get(key)
+        if data is not None:
+            self.images.move_to_end(key)
+        return data
+
+    def put(self, key, data):
+        if key in self.images:
+            self.size -= len(self.images.pop(key))
+        if len(data) > self.max_bytes:
+            return
+
+        self.images[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, old_data = self.images.popitem(last=False)
+            self.size -= len(old_data)
+
+
+class RenderPool:
+    def __init__(self, kind='thread', workers=4,
+                 cache_bytes=32 * 1024 * 1024):
+        if kind == 'thread':
+            self.executor = ThreadPoolExecutor(workers)
+        elif kind == 'process':
+            self.executor = ProcessPoolExecutor(workers)
+        else:
+            raise ValueError(f'Unknown render executor {kind!r}, '
+                             'use "thread" or "process".')
+        self.cache = RenderCache(cache_bytes)
+
+    async def render(self, match, flipped=False):
+        # the position is copied now so later moves can't change the image
+        position = match.get_position()
+        data = self.cache.get((position, flipped))
+
+        if data is None:
+            loop = asyncio.get_event_loop()
+            data = await loop.run_in_executor(
+                self.executor, render_position, position, flipped)
+            self.cache.put((position, flipped), data)
+        return io.BytesIO(data)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,26 @@
+from PIL import Image
+import itertools
+
+PIECE_NAMES = ('rook', 'knight', 'bishop', 'queen', 'king', 'pawn')
+BOARD_NAMES = ('board-normal', 'board-flipped')
+
+
+def load_sprites(path='pictures'):
+    # decode every picture once, converted so they can be pasted directly
+    sprites = {}
+    names = [f'{piece}-{color}' for piece, color
+             in itertools.product(PIECE_NAMES, ('w', 'b'))]
+    for name in names + list(BOARD_NAMES):
+        with Image.open(f'{path}/{name}.png') as img:
+            sprites[name] = img.convert('RGBA')
+    return sprites
+
+
+SPRITES = load_sprites()
+
+
+def get_sprite_name(piece):
+    if piece.is_white:
+        return f'{piece.name}-w'
+    else:
+        return f'{piece.name}-b'
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from typing import Dict
+import asyncio
+import time
+
+
+class UserCache:
+    def __init__(self, fetch, max_size=1024, ttl=3600.0):
+        # fetch is a coroutine that takes a user id, like bot.get_user_info,
+        # users older than ttl seconds are fetched again and the least
+        # recently used ones are dropped past max_size
+        self.fetch = fetch
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.in_flight = {}  # type: Dict[int, asyncio.Future]
+
+    def put(self, user):
+        # users that come with a message are as fresh as it gets
+        self.entries[user.id] = (user, time.monotonic())
+        self.entries.move_to_end(user.id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def peek(self, user_id, default=None):
+        # whatever is cached, without fetching
+        entry = self.entries.get(user_id)
+        return default if entry is None else entry[0]
+
+    async def load(self, user_id):
+        try:
+            user = await self.fetch(user_id)
+            self.put(user)
+            return user
+        finally:
+            self.in_flight.pop(user_id, None)
+
+    async def get(self, user_id):
+        entry = self.entries.get(user_id)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self.entries.move_to_end(user_id)
+            return entry[0]
+
+        # everyone asking for the same user waits on the same fetch
+        if user_id not in self.in_flight:
+            self.in_flight[user_id] = asyncio.ensure_future(
+                self.load(user_id))
+        try:
+            return await asyncio.shield(self.in_flight[user_id])
+        except Exception:
+            # an old name is better than none
+            if entry is not None:
+                return entry[0]
+            raise
+
+    async def get_many(self, user_ids):
+        # user id to user, fetching the missing ones at the same time
+        user_ids = list(dict.fromkeys(user_ids))
+        users = await asyncio.gather(*[self.get(user_id)
+                                       for user_id in user_ids])
+        return dict(zip(user_ids, users))
@@ -0,0 +1,25 @@
+import itertools
+import random
+
+# fixed seed so a position gets the same key every time the bot runs
+_random = random.Random(0x5eed)
+
+PIECE_KEYS = {
+    (is_white, name): [_random.getrandbits(64) for _ in range(64)]
+    for is_white, name in itertools.product(
+        (True, False),
+        ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king'))
+}
+BLACK_TURN_KEY = _random.getrandbits(64)
+EN_PASSANT_KEYS = [_random.getrandbits(64) for _ in range(8)]
+
+# castling rights are 4 bits: white kingside, white queenside,
+# black kingside and black queenside
+_castling_right_keys = [_random.getrandbits(64) for _ in range(4)]
+CASTLING_KEYS = []
+for rights in range(16):
+    key = 0
+    for bit, right_key in enumerate(_castling_right_keys):
+        if rights >> bit & 1:
+            key ^= right_key
+    CASTLING_KEYS.append(key)
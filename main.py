@@ -1,4 +1,5 @@
 from discord.ext import commands
+from cogs.utils.users import UserCache
 import sys
 import json
 import discord
@@ -50,6 +51,10 @@ async def on_command_error(ctx, exception):
 
 
 def main():
+    bot.config = config
+    bot.user_cache = UserCache(bot.get_user_info,
+                               config.get('user_cache_size', 1024),
+                               config.get('user_cache_ttl', 3600.0))
     for extension in extensions:
         try:
             bot.load_extension(extension)
@@ -58,7 +63,6 @@ def main():
             print(exc)
             traceback.print_exc()
 
-    bot.usernames = {}
     bot.run(token)
 
 
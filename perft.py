@@ -0,0 +1,114 @@
+from cogs.utils.bitboard import BitBoard, PIECES
+from cogs.utils.board import Board
+from cogs.utils.pieces.pawn import Pawn
+import argparse
+import sys
+import time
+
+# (name, fen, known leaf counts for depth 1, 2, 3...)
+POSITIONS = [
+    ('start',
+     'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+     (20, 400, 8902, 197281, 4865609)),
+    ('kiwipete',
+     'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     (48, 2039, 97862, 4085603)),
+    ('endgame',
+     '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     (14, 191, 2812, 43238, 674624)),
+    ('promotions',
+     'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     (6, 264, 9467, 422333)),
+    ('discovered',
+     'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     (44, 1486, 62379, 2103487)),
+    ('middlegame',
+     'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 '
+     'w - - 0 10',
+     (46, 2079, 89890, 3894594)),
+]
+
+ENGINES = {'board': Board, 'bitboard': BitBoard}
+PROMOTIONS = ('queen', 'rook', 'bishop', 'knight')
+
+
+def get_moves(board):
+    # legal moves with every promotion spelled out, the bitboard ones
+    # already come with their promotion piece
+    if isinstance(board, BitBoard):
+        return [(origin % 8, origin // 8, target % 8, target // 8,
+                 None if promotion is None else PIECES[promotion].name)
+                for origin, target, promotion in board.legal_moves]
+
+    moves = []
+    for x, y, nx, ny in board.get_legal_moves():
+        if isinstance(board.chessboard[y][x], Pawn) and ny in (0, 7):
+            moves.extend((x, y, nx, ny, p) for p in PROMOTIONS)
+        else:
+            moves.append((x, y, nx, ny, None))
+    return moves
+
+
+def perft(board, depth):
+    moves = get_moves(board)
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        board.execute(*move)
+        nodes += perft(board, depth - 1)
+        board.undo()
+    return nodes
+
+
+def divide(board, depth):
+    for x, y, nx, ny, promote_to in get_moves(board):
+        board.execute(x, y, nx, ny, promote_to)
+        nodes = perft(board, depth - 1) if depth > 1 else 1
+        board.undo()
+        move = 'abcdefgh'[x] + '87654321'[y] + 'abcdefgh'[nx] \
+            + '87654321'[ny] + (promote_to[0] if promote_to else '')
+        print(f'{move}: {nodes}')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Count leaf nodes of the legal move tree and compare '
+                    'them with known results.')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='board')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--position', choices=[p[0] for p in POSITIONS],
+                        action='append',
+                        help='position to test, can be repeated '
+                             '(default: all of them)')
+    parser.add_argument('--divide', action='store_true',
+                        help='show the node count below each root move')
+    args = parser.parse_args()
+
+    failed = False
+    for name, fen, expected in POSITIONS:
+        if args.position and name not in args.position:
+            continue
+
+        depth = min(args.depth, len(expected))
+        board = ENGINES[args.engine].from_fen(fen)
+        if args.divide:
+            divide(board, depth)
+
+        start = time.perf_counter()
+        nodes = perft(board, depth)
+        elapsed = time.perf_counter() - start
+
+        correct = nodes == expected[depth - 1]
+        failed = failed or not correct
+        print(f'{name:<11} depth {depth}: {nodes:>9} nodes '
+              f'({"ok" if correct else f"expected {expected[depth - 1]}"})'
+              f' in {elapsed:.2f}s, {nodes / elapsed:,.0f} nodes/s')
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()